@@ -2,12 +2,16 @@
 """Base class for all agents with common functionality."""
 
 from abc import ABC, abstractmethod
+from itertools import islice
 from typing import Dict, Any, List, Optional
-import json
 import time
+from core import json_utils
 from core.clients import generate_text, enhanced_web_search
 
 class BaseAgent(ABC):
+    # Subclasses that add no instance state can declare `__slots__ = ()` and skip the per-instance dict.
+    __slots__ = ("agent_type",)
+
     def __init__(self):
         self.agent_type = self.__class__.__name__
     
@@ -23,7 +27,7 @@ class BaseAgent(ABC):
             try:
                 resp_obj = generate_text(prompt, is_json=True)
                 text = getattr(resp_obj, "text", str(resp_obj))
-                parsed = json.loads(text)
+                parsed = json_utils.loads(text)
 
                 if self.validate_response(parsed, response_schema):
                     return parsed
@@ -34,7 +38,7 @@ class BaseAgent(ABC):
                     fix_prompt = (
                         "The previous response did not strictly follow the expected JSON schema. "
                         "Please reformat ONLY valid JSON that matches the schema.\n"
-                        f"Schema: {json.dumps(response_schema)}\nPrevious response: {json.dumps(parsed)}"
+                        f"Schema: {json_utils.dumps(response_schema)}\nPrevious response: {json_utils.dumps(parsed)}"
                     )
                     time.sleep(0.2)
                     prompt = fix_prompt
@@ -67,17 +71,38 @@ class BaseAgent(ABC):
         }
     
     def format_pointwise(self, data: Dict[str, Any]) -> List[str]:
-        """Convert complex data into simple bullet points."""
-        points = []
-        
+        """Convert complex data into simple bullet points.
+
+        Results that already carry a non-empty `pointwise_summary` list return it as-is, so
+        repeated calls on the same result do not rebuild the bullets.
+        """
         if "error" in data:
             return [f"Error: {data['error']}"]
         
+        existing = data.get("pointwise_summary")
+        if existing and isinstance(existing, list):
+            return existing
+        
+        points = []
+        summary = data.get("executive_summary")
+        market_size = data.get("market_size")
+        competitors = data.get("competitors")
+        
         # Add relevant points based on data content
-        if "executive_summary" in data:
-            points.append(data["executive_summary"])
+        if summary:
+            points.append(summary)
+        
+        # Market size is a structured estimate in some agents and free text in others
+        if isinstance(market_size, dict):
+            tam = market_size.get("total_addressable_market")
+            if tam:
+                points.append(f"Market size: {tam:,.0f} {market_size.get('currency', 'USD')}")
+        elif market_size:
+            points.append(f"Market size: {market_size}")
         
-        if "market_size" in data and data["market_size"].get("total_addressable_market"):
-            points.append(f"Market size: {data['market_size']['total_addressable_market']:,.0f} {data['market_size'].get('currency', 'USD')}")
+        if competitors:
+            names = ", ".join(c["name"] for c in islice(competitors, 3) if isinstance(c, dict) and c.get("name"))
+            if names:
+                points.append(f"Key competitors: {names}")
         
         return points[:5]  # Return top 5 points
\ No newline at end of file
@@ -1,9 +1,47 @@
 from .base_agent import BaseAgent
-from core.clients import generate_text_with_fallback, enhanced_web_search
+from core import json_utils
+from core.clients import dedupe_results, generate_text_with_fallback, search_many
+from core.text import pack_json
 from models.schemas import CriticResult
 from pydantic import ValidationError
-import json
-from typing import Dict, Any, List, Optional
+import logging
+from typing import Dict, Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens allotted to the failure-mode search results (whole results only).
+_FAILURE_EVIDENCE_TOKENS = 1000
+
+# Red-team critique instructions; `_CRITIQUE_PROMPT` carries the analyst reports and failure research.
+_CRITIQUE_SYSTEM_PROMPT = """\
+You are a Principal at a Venture Capital firm with a 'Red Team' mindset. Your job is to be brutally honest and find the fatal flaws in a startup plan before investment.
+
+Synthesize ALL the analyst reports and failure-mode research you are given to produce a final critical assessment.
+1.  **Critique:** Write a sharp, concise paragraph identifying the single most critical flaw.
+2.  **Blind Spots:** List 2-3 unstated assumptions or overlooked areas.
+3.  **Contradictory Findings:** Find contradictions between the reports (e.g., 'Tech report shows high complexity, but Finance report shows low dev costs').
+4.  **Validation Questions:** List the top 3-4 tough questions the founders MUST answer.
+5.  **Confidence Score:** Provide your confidence (0-100) in this critical assessment.
+
+Return ONLY a JSON object that strictly adheres to the 'CriticResult' schema.
+"""
+
+_CRITIQUE_PROMPT = """\
+**ANALYST REPORTS (INPUT):**
+---
+**Idea:** {idea}
+**Location Analysis:** {location}
+**Market Analysis:** {market}
+**Technical Feasibility:** {tech}
+**Financial Outlook:** {finance}
+**Risk Assessment:** {risk}
+---
+
+**FAILURE MODE RESEARCH (ADDITIONAL EVIDENCE):**
+---
+{failure_evidence}
+---
+"""
 
 class CriticAgent(BaseAgent):
     """
@@ -15,14 +53,14 @@ class CriticAgent(BaseAgent):
         """
         Executes the full critical analysis pipeline.
         """
-        print(f"🎯 CriticAgent: Starting critical analysis for '{idea}'")
+        logger.info("CriticAgent: Starting critical analysis for '%s'", idea)
         
         try:
             # 1. Perform targeted research based on the initial analysis
             failure_evidence = self._research_common_failures(idea, risk_data)
             
             # 2. Synthesize all information into a critical analysis
-            critique_json = self._synthesize_critique(
+            critique = self._synthesize_critique(
                 idea=idea,
                 finance_data=finance_data,
                 risk_data=risk_data,
@@ -31,7 +69,7 @@ class CriticAgent(BaseAgent):
                 location_data=location_data,
                 failure_evidence=failure_evidence
             )
-            if isinstance(critique_json, dict) and "error" in critique_json:
+            if isinstance(critique, dict) and "error" in critique:
                 fallback = CriticResult(
                     critique="Critic unavailable due to synthesis error.",
                     blind_spots=[],
@@ -40,14 +78,13 @@ class CriticAgent(BaseAgent):
                 )
                 return fallback.model_dump()
 
-            # 3. Validate and structure the final output
-            validated_critique = CriticResult.model_validate(critique_json)
-            print("   ✅ Critic analysis completed and validated.")
-            return validated_critique.model_dump()
+            # 3. The critique arrives already validated; structure the final output
+            logger.info("Critic analysis completed and validated.")
+            return critique.model_dump()
 
         except ValidationError as e:
             error_msg = f"Critic agent output failed Pydantic validation: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = CriticResult(
                 critique="Could not generate critic report due to validation error.",
                 blind_spots=[],
@@ -57,7 +94,7 @@ class CriticAgent(BaseAgent):
             return fallback.model_dump()
         except Exception as e:
             error_msg = f"An unexpected error occurred in CriticAgent: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = CriticResult(
                 critique=f"Critic generation failed: {str(e)}",
                 blind_spots=[],
@@ -74,19 +111,19 @@ class CriticAgent(BaseAgent):
         if not top_risk_titles:
             return "No specific risks were provided to research."
 
-        print(f"   -> Researching failure modes related to risks: {top_risk_titles}")
+        logger.debug("Researching failure modes related to risks: %s", top_risk_titles)
         queries = [f"why startups fail due to '{risk_title}' for '{idea}'" for risk_title in top_risk_titles]
         
-        evidence = []
-        for query in queries:
-            results = enhanced_web_search(query, max_results=2)
-            evidence.extend(results)
+        # Related risks often surface the same post-mortem; send each page once
+        evidence = dedupe_results(r for results in search_many(queries, max_results=2) for r in results)
         
-        return json.dumps(evidence, indent=2)
+        return pack_json(evidence, token_budget=_FAILURE_EVIDENCE_TOKENS)
 
-    def _synthesize_critique(self, **kwargs) -> dict:
+    def _synthesize_critique(self, **kwargs) -> Union[CriticResult, Dict[str, Any]]:
         """
         Uses an LLM to generate the final critical analysis based on all available data.
+        Returns the validated `CriticResult`, or an `{"error": ...}` dict when the LLM
+        is unavailable; raises `ValidationError` for off-schema output.
         """
         # Unpack all context for the prompt
         idea = kwargs.get('idea')
@@ -97,37 +134,30 @@ class CriticAgent(BaseAgent):
         location_data = kwargs.get('location_data')
         failure_evidence = kwargs.get('failure_evidence')
 
-        prompt = f"""
-        You are a Principal at a Venture Capital firm with a 'Red Team' mindset. Your job is to be brutally honest and find the fatal flaws in a startup plan before investment.
-
-        **ANALYST REPORTS (INPUT):**
-        ---
-        **Idea:** {idea}
-        **Location Analysis:** {json.dumps(location_data, indent=2, default=str)}
-        **Market Analysis:** {json.dumps(market_data, indent=2, default=str)}
-        **Technical Feasibility:** {json.dumps(tech_data, indent=2, default=str)}
-        **Financial Outlook:** {json.dumps(finance_data, indent=2, default=str)}
-        **Risk Assessment:** {json.dumps(risk_data, indent=2, default=str)}
-        ---
-
-        **FAILURE MODE RESEARCH (ADDITIONAL EVIDENCE):**
-        ---
-        {failure_evidence[:4000]}
-        ---
-
-        **YOUR TASK:**
-        Synthesize ALL the information above to produce a final critical assessment.
-        1.  **Critique:** Write a sharp, concise paragraph identifying the single most critical flaw.
-        2.  **Blind Spots:** List 2-3 unstated assumptions or overlooked areas.
-        3.  **Contradictory Findings:** Find contradictions between the reports (e.g., 'Tech report shows high complexity, but Finance report shows low dev costs').
-        4.  **Validation Questions:** List the top 3-4 tough questions the founders MUST answer.
-        5.  **Confidence Score:** Provide your confidence (0-100) in this critical assessment.
-
-        Return ONLY a JSON object that strictly adheres to the 'CriticResult' schema.
-        """
+        prompt = _CRITIQUE_PROMPT.format(
+            idea=idea,
+            location=json_utils.dumps(location_data),
+            market=json_utils.dumps(market_data),
+            tech=json_utils.dumps(tech_data),
+            finance=json_utils.dumps(finance_data),
+            risk=json_utils.dumps(risk_data),
+            failure_evidence=failure_evidence,
+        )
         
         try:
-            response = generate_text_with_fallback(prompt, is_json=True)
-            return json.loads(response.text)
+            response = generate_text_with_fallback(prompt, is_json=True, system=_CRITIQUE_SYSTEM_PROMPT)
         except Exception as e:
-            return {"error": f"LLM synthesis failed in CriticAgent: {e}"}
\ No newline at end of file
+            return {"error": f"LLM synthesis failed in CriticAgent: {e}"}
+        try:
+            # Parse and validate the raw response in a single pydantic-core pass
+            return CriticResult.model_validate_json(response.text)
+        except ValidationError:
+            # Only re-parse on the slow path, to tell an LLM error payload apart
+            # from genuinely off-schema output
+            try:
+                parsed = json_utils.loads(response.text)
+            except ValueError as e:
+                return {"error": f"LLM synthesis failed in CriticAgent: {e}"}
+            if isinstance(parsed, dict) and "error" in parsed:
+                return parsed
+            raise
\ No newline at end of file
@@ -1,14 +1,18 @@
 from .base_agent import BaseAgent
+from core import json_utils
 from core.clients import (
     generate_text_with_fallback, 
     enhanced_web_search, 
-    get_proxy_company_financials
+    get_proxy_company_financials,
+    search_many
 )
 from models.schemas import FinanceResult
 from pydantic import ValidationError
-import json
+import logging
 from typing import Dict, Any, List, Optional
 
+logger = logging.getLogger(__name__)
+
 class FinanceAgent(BaseAgent):
     """
     A highly advanced agent that builds a financial model grounded in the
@@ -19,7 +23,7 @@ class FinanceAgent(BaseAgent):
         """
         Executes the full, evidence-based financial analysis pipeline.
         """
-        print(f"💰 FinanceAgent: Starting advanced proxy-based financial analysis for '{idea}'")
+        logger.info("FinanceAgent: Starting advanced proxy-based financial analysis for '%s'", idea)
         
         try:
             country_code = location_analysis.get("country_code") if location_analysis and isinstance(location_analysis, dict) else (location_analysis.get("normalized_location", {}).get("country_code", "US") if location_analysis else "US")
@@ -76,12 +80,12 @@ class FinanceAgent(BaseAgent):
 
             # 4. Validate and structure the final output
             validated_model = FinanceResult.model_validate(financial_model_json)
-            print("   ✅ Financial model completed and validated.")
+            logger.info("Financial model completed and validated.")
             return validated_model.model_dump()
 
         except ValidationError as e:
             error_msg = f"Finance agent output failed Pydantic validation: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = FinanceResult(
                 initial_development={"note": "validation_failed"},
                 monthly_operations={"note": "validation_failed"},
@@ -93,7 +97,7 @@ class FinanceAgent(BaseAgent):
             return fallback.model_dump()
         except Exception as e:
             error_msg = f"An unexpected error occurred in FinanceAgent: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = FinanceResult(
                 initial_development={"note": "exception"},
                 monthly_operations={"note": "exception"},
@@ -106,7 +110,7 @@ class FinanceAgent(BaseAgent):
 
     def _get_proxy_financial_evidence(self, idea: str) -> List[Dict[str, Any]]:
         """Finds and fetches financial data for comparable public companies."""
-        print(f"   -> Finding proxy companies for: '{idea}'")
+        logger.debug("Finding proxy companies for: '%s'", idea)
         
         # Use an LLM to find tickers from a targeted web search
         query = f"publicly traded competitors of '{idea}' stock tickers"
@@ -120,15 +124,15 @@ class FinanceAgent(BaseAgent):
         """
         try:
             response = generate_text_with_fallback(prompt, is_json=True)
-            tickers = json.loads(response.text).get("tickers", [])
+            tickers = json_utils.loads(response.text).get("tickers", [])
         except Exception:
             tickers = []
 
         if not tickers:
-            print("   -> No proxy tickers found.")
+            logger.debug("No proxy tickers found.")
             return []
 
-        print(f"   -> Found tickers: {tickers}. Fetching their financial data.")
+        logger.debug("Found tickers: %s. Fetching their financial data.", tickers)
         financial_evidence = []
         for ticker in tickers:
             data = get_proxy_company_financials(ticker)
@@ -141,17 +145,18 @@ class FinanceAgent(BaseAgent):
         if not city:
             return "No specific city provided for local cost research."
 
-        print(f"   -> Researching local costs in {city}, {country_code}")
+        logger.debug("Researching local costs in %s, %s", city, country_code)
         queries = [
             f"average software developer salary {city}",
             f"commercial office rent per square foot {city}",
             f"startup legal costs in {country_code}"
         ]
+        # The searches are independent, so they run on a small thread pool; results keep query order
         evidence = []
-        for query in queries:
-            results = enhanced_web_search(query, max_results=2, country=country_code.lower())
+        all_results = search_many(queries, max_results=2, country=country_code.lower())
+        for query, results in zip(queries, all_results):
             if results:
-                evidence.append(f"Evidence for '{query}':\n" + json.dumps(results, indent=2))
+                evidence.append(f"Evidence for '{query}':\n" + json_utils.dumps(results))
         
         return "\n\n".join(evidence)
 
@@ -167,7 +172,7 @@ class FinanceAgent(BaseAgent):
 
         **Financial Evidence from Public Proxy Companies:**
         ---
-        {json.dumps(proxy_financials, indent=2)}
+        {json_utils.dumps(proxy_financials)}
         ---
 
         **Local Cost Evidence (Salaries, Rent, etc.):**
@@ -186,6 +191,6 @@ class FinanceAgent(BaseAgent):
         
         try:
             response = generate_text_with_fallback(prompt, is_json=True)
-            return json.loads(response.text)
+            return json_utils.loads(response.text)
         except Exception as e:
             return {"error": f"LLM synthesis failed in FinanceAgent: {e}"}
\ No newline at end of file
@@ -1,16 +1,89 @@
 from .base_agent import BaseAgent
-from core.clients import generate_text_with_fallback, enhanced_web_search
+from core.cache import MemoryCache, PersistentCache, make_key
+from core.semantic_cache import SemanticCache
+from core import json_utils
+from core.clients import dedupe_results, generate_text_with_fallback, gather_web_searches
+from core.text import normalize_whitespace, pack_json
 from models.schemas import LocationAnalysisResult
 from pydantic import ValidationError
+# These libraries may be optional in some environments; degrade gracefully.
 try:
     from pytrends.request import TrendReq
-    from geopy.geocoders import Nominatim
 except ImportError:
-    # These libraries may be optional in some environments; degrade gracefully.
     TrendReq = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from geopy.geocoders import Nominatim
+    from geopy.adapters import RequestsAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
     Nominatim = None
-import json
-from typing import Dict, Any, Optional
+    RequestsAdapter = None
+import asyncio
+from collections import defaultdict
+import functools
+import logging
+import re
+import threading
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_geolocator = None
+_geolocator_lock = threading.Lock()
+
+# Locations repeat heavily ("Pune", "Bangalore", ...) and Nominatim's usage policy
+# discourages repeat lookups, so successful geocodes are kept for 30 days.
+_geocode_cache = PersistentCache("geocode", ttl=30 * 24 * 3600)
+
+# Near-duplicate ideas for the same location reuse a recent analysis (6h TTL).
+_analysis_cache = SemanticCache("location_analysis", threshold=0.93, ttl=6 * 3600)
+# Prompt tokens allotted to web evidence in the synthesis prompt (whole results only).
+_WEB_EVIDENCE_TOKENS = 1500
+
+# Web research run for every location, keyed by evidence category. Filled with
+# str.format_map from the geocoded fields plus the idea.
+_INTELLIGENCE_QUERY_TEMPLATES = {
+    "competitors": "similar businesses or startups to '{idea}' in {normalized_name}",
+    "demographics": "demographics and consumer behavior in {normalized_name}",
+    "economy": "key industries and economic outlook for {normalized_name}",
+}
+
+# Google Trends accepts at most five keywords per payload.
+_TRENDS_BATCH_SIZE = 5
+
+# Trend lookups per (country, idea). Google throttles pytrends aggressively, so
+# results are kept for an hour and empty/failed lookups for five minutes.
+_trends_cache = MemoryCache(maxsize=256, ttl=3600)
+_TRENDS_MISS_TTL = 300
+
+# Titles that look like local fitness business pages; one compiled scan per title.
+_LOCAL_BUSINESS_RE = re.compile(r"gym|fitness|studio|trainer|wellness", re.IGNORECASE)
+
+
+def _shared_geolocator():
+    """Returns a process-wide Nominatim client.
+
+    The coordinator builds a new agent per request, so keeping the geocoder at
+    module level lets every run reuse one pooled requests.Session (and its
+    TCP/TLS connection to Nominatim) instead of re-handshaking each time.
+    """
+    global _geolocator
+    if Nominatim is None:
+        return None
+    with _geolocator_lock:
+        if _geolocator is None:
+            adapter_factory = functools.partial(
+                RequestsAdapter,
+                pool_connections=10,
+                pool_maxsize=10,
+                max_retries=Retry(total=3, backoff_factor=0.3),
+            )
+            _geolocator = Nominatim(user_agent="startup_validator_v3", adapter_factory=adapter_factory)
+    return _geolocator
 
 class LocationAnalysisAgent(BaseAgent):
     """
@@ -19,15 +92,37 @@ class LocationAnalysisAgent(BaseAgent):
     """
     def __init__(self):
         # Initialize only the components available; allow the agent to run in degraded mode
-        self.geolocator = Nominatim(user_agent="startup_validator_v3") if Nominatim else None
+        self.geolocator = _shared_geolocator()
         self.trends = TrendReq(hl='en-US', tz=360) if TrendReq else None
 
-    def run(self, idea: str, location_text: str, **kwargs) -> Dict[str, Any]:
-        print(f"🌍 LocationAnalysisAgent: Starting advanced analysis for '{idea}' in '{location_text}'")
-        
+    def run(self, idea: str, location_text: str, provided_location: Optional[Dict[str, Any]] = None,
+            prefetched_trends: Optional[Dict[str, Optional[dict]]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Executes the location analysis pipeline.
+
+        Callers that already resolved the place can pass `provided_location`. When it
+        carries `latitude`, `longitude` and `country_code`, geocoding is skipped; when
+        it also carries `prefetched_intelligence` (the dict `_gather_intelligence`
+        returns), the web and Trends lookups are skipped as well. `prefetched_trends`
+        is the mapping returned by `get_search_trends_batch`.
+        """
+        logger.info("LocationAnalysisAgent: Starting advanced analysis for '%s' in '%s'", idea, location_text)
+
+        # Only the idea is compared semantically; the location and any caller-resolved
+        # geo data, intelligence or trends must match exactly.
+        cache_scope = make_key([normalize_whitespace(location_text.lower()), provided_location or None,
+                                prefetched_trends])
+        cached = _analysis_cache.get(idea, scope=cache_scope)
+        if cached is not None:
+            logger.info("Reusing recent location analysis for a similar idea in '%s'.", location_text)
+            return cached
+
         try:
             # 1. Geocode the location to get structured data
-            geo_data = self._geocode_location(location_text)
+            provided_location = provided_location or {}
+            geo_data = self._geo_from_provided(location_text, provided_location)
+            if geo_data is None:
+                geo_data = self._geocode_location(location_text)
             if "error" in geo_data:
                 # Provide a minimal, schema-compatible fallback object
                 fallback = {
@@ -46,54 +141,72 @@ class LocationAnalysisAgent(BaseAgent):
                 return fallback
 
             # 2. Gather multi-source intelligence
-            intelligence = self._gather_intelligence(idea, geo_data)
+            intelligence = provided_location.get("prefetched_intelligence")
+            if intelligence is None:
+                intelligence = self._gather_intelligence(idea, geo_data, prefetched_trends)
 
             # 3. Perform AI-powered synthesis of all gathered data
             analysis_json = self._synthesize_analysis(idea, geo_data, intelligence)
             if isinstance(analysis_json, dict) and "error" in analysis_json:
                 # Produce a deterministic, evidence-driven summary instead of raw error
+                # Not cached: a provider outage should not pin a degraded analysis.
                 return self._deterministic_location_summary(idea, geo_data, intelligence)
 
             # 4. Final validation against our strict schema
             validated_report = LocationAnalysisResult.model_validate(analysis_json)
-            print(f"   ✅ Location analysis for '{location_text}' completed and validated.")
-            return validated_report.model_dump()
+            logger.info("Location analysis for '%s' completed and validated.", location_text)
+            result = validated_report.model_dump()
+            _analysis_cache.set(idea, result, scope=cache_scope)
+            return result
 
         except ValidationError as e:
-            print(f"   ⚠️ Location analysis failed validation. Attempting self-correction... Error: {e}")
-            # If self-correction fails, return a schema-compliant fallback
-            try:
-                return self._self_correct_analysis(analysis_json, str(e))
-            except Exception:
-                return {
-                    "normalized_name": location_text,
-                    "coordinates": {"latitude": 0.0, "longitude": 0.0},
-                    "country_code": "",
-                    "region": None,
-                    "city": None,
-                    "viability_score": 0.0,
-                    "market_readiness": 0.0,
-                    "key_opportunities": [],
-                    "critical_risks": [],
-                    "recommendations": [],
-                    "evidence": []
-                }
+            logger.warning("Location analysis failed validation. Attempting self-correction... Error: %s", e)
+            corrected = self._self_correct_analysis(analysis_json, str(e))
+            if "error" not in corrected:
+                _analysis_cache.set(idea, corrected, scope=cache_scope)
+                return corrected
+            # _self_correct_analysis never raises; it reports failure as an error dict,
+            # which used to be returned to the caller verbatim.
+            logger.warning("%s. Using the deterministic summary instead.", corrected['error'])
+            return self._deterministic_location_summary(idea, geo_data, intelligence)
         except Exception as e:
             error_msg = f"An unexpected error occurred in LocationAnalysisAgent: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             return {"error": error_msg}
 
+    @staticmethod
+    def _geo_from_provided(location_text: str, provided: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Builds geo data from a caller-resolved location, or None if it is incomplete."""
+        lat, lon = provided.get("latitude"), provided.get("longitude")
+        country_code = provided.get("country_code")
+        if lat is None or lon is None or not country_code:
+            return None
+        return {
+            "normalized_name": provided.get("normalized_name") or location_text,
+            "coordinates": {"latitude": float(lat), "longitude": float(lon)},
+            "country_code": str(country_code).upper(),
+            "region": provided.get("region", ""),
+            "city": provided.get("city", ""),
+            "type": provided.get("type", "unknown"),
+            "importance": provided.get("importance", 0)
+        }
+
     def _geocode_location(self, location_text: str) -> Dict[str, Any]:
         """Normalizes a location string into structured geographic data."""
         try:
             if not self.geolocator:
                 return {"error": "geolocator_unavailable"}
+            cache_key = normalize_whitespace(location_text.lower())
+            cached = _geocode_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             location = self.geolocator.geocode(location_text, addressdetails=True, language='en')
             if not location:
                 return {"error": f"Could not find location: {location_text}"}
             
             addr = location.raw.get('address', {})
-            return {
+            geo_data = {
                 "normalized_name": location.address,
                 "coordinates": {"latitude": location.latitude, "longitude": location.longitude},
                 "country_code": addr.get('country_code', '').upper(),
@@ -102,47 +215,71 @@ class LocationAnalysisAgent(BaseAgent):
                 "type": location.raw.get('type', 'unknown'),
                 "importance": location.raw.get('importance', 0)
             }
+            _geocode_cache.set(cache_key, geo_data)
+            return geo_data
         except Exception as e:
             return {"error": f"Geocoding failed: {e}"}
 
-    def _gather_intelligence(self, idea: str, geo_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _gather_intelligence(self, idea: str, geo_data: Dict[str, Any],
+                             prefetched_trends: Optional[Dict[str, Optional[dict]]] = None) -> Dict[str, Any]:
         """Gathers data from web search and Google Trends."""
-        location_name = geo_data['normalized_name']
         country_code = geo_data['country_code']
-        
-        queries = {
-            "competitors": f"similar businesses or startups to '{idea}' in {location_name}",
-            "demographics": f"demographics and consumer behavior in {location_name}",
-            "economy": f"key industries and economic outlook for {location_name}"
-        }
-        
-        search_results = {}
-        for key, query in queries.items():
-            search_results[key] = enhanced_web_search(query, max_results=4, country=country_code.lower())
+        fields = defaultdict(str, geo_data, idea=idea)
+        queries = {category: template.format_map(fields)
+                   for category, template in _INTELLIGENCE_QUERY_TEMPLATES.items()}
 
-        trend_data = self._get_search_trends(idea, country_code)
+        search_results, trend_data = asyncio.run(
+            self._fetch_intelligence(idea, queries, country_code, prefetched_trends)
+        )
 
         return {"web_evidence": search_results, "trend_data": trend_data}
 
-    def _deterministic_location_summary(self, idea: str, geo_data: Dict[str, Any], evidence: Dict[str, Any]) -> Dict[str, Any]:
+    async def _fetch_intelligence(self, idea: str, queries: Dict[str, str], country_code: str,
+                                  prefetched_trends: Optional[Dict[str, Optional[dict]]] = None):
+        """Runs all web searches and the Google Trends lookup concurrently.
+
+        Categories that resolve to the same query text share a single search, and
+        trend data already fetched in a batch is used instead of a new lookup.
+        """
+        unique_queries = list(dict.fromkeys(queries.values()))
+        searches = gather_web_searches(unique_queries, max_results=4, country=country_code.lower(), concurrency=5)
+        if prefetched_trends is not None and idea in prefetched_trends:
+            results = await searches
+            trend_data = prefetched_trends[idea]
+        else:
+            trends = asyncio.to_thread(self._get_search_trends, idea, country_code)
+            results, trend_data = await asyncio.gather(searches, trends)
+        by_query = dict(zip(unique_queries, results))
+        return {category: by_query[query] for category, query in queries.items()}, trend_data
+
+    @staticmethod
+    def _deterministic_location_summary(idea: str, geo_data: Dict[str, Any], evidence: Dict[str, Any]) -> Dict[str, Any]:
         """Create a conservative, evidence-driven local summary without using an LLM."""
         web = evidence.get('web_evidence', {})
-        sources = []
-        local_businesses = []
-        for key, results in web.items():
+        # Only the first 6 distinct sources and first 3 local businesses influence
+        # the summary, so stop collecting each as soon as it is full.
+        with_url = (r for results in web.values() for r in results[:6] if r.get('url'))
+        sources: List[str] = [r['url'] for r in dedupe_results(with_url, limit=6)]
+        business_names: List[str] = []
+        # The same listing often comes back for several queries; count each business once
+        seen_names = set()
+        for results in web.values():
             for r in results[:6]:
-                url = r.get('url')
-                title = r.get('title') or r.get('snippet') or url
-                sources.append(url) if url else None
+                if len(business_names) >= 3:
+                    break
                 # Heuristic: titles that look like local business pages
-                if any(word in (title or '').lower() for word in ('gym', 'fitness', 'studio', 'trainer', 'wellness')):
-                    local_businesses.append({'name': title[:120], 'url': url})
+                title = r.get('title') or r.get('snippet') or r.get('url')
+                if title and _LOCAL_BUSINESS_RE.search(title):
+                    name = title[:120]
+                    if name not in seen_names:
+                        seen_names.add(name)
+                        business_names.append(name)
 
         opportunities = []
         risks = []
         recommendations = []
-        if local_businesses:
-            opportunities.append('Partnerships with local gyms and trainers: ' + ', '.join([b['name'] for b in local_businesses[:3]]))
+        if business_names:
+            opportunities.append('Partnerships with local gyms and trainers: ' + ', '.join(business_names))
             recommendations.append('Pilot integrations with 1-3 local gyms to validate product-market fit.')
         else:
             recommendations.append('Start with a small digital pilot and local advertising to validate demand.')
@@ -152,8 +289,8 @@ class LocationAnalysisAgent(BaseAgent):
             opportunities.append('Rising search interest indicates growing local demand.')
 
         # Simple viability heuristic
-        viability_score = 30.0 + min(len(local_businesses) * 10, 30)
-        market_readiness = 2.0 + min(len(local_businesses), 3)
+        viability_score = 30.0 + len(business_names) * 10
+        market_readiness = 2.0 + len(business_names)
 
         return {
             'normalized_name': geo_data.get('normalized_name'),
@@ -166,42 +303,93 @@ class LocationAnalysisAgent(BaseAgent):
             'key_opportunities': opportunities,
             'critical_risks': risks,
             'recommendations': recommendations,
-            'evidence': [{'source': s} for s in sources[:6]]
+            'evidence': [{'source': s} for s in sources]
         }
 
     def _get_search_trends(self, idea: str, country_code: str) -> Optional[dict]:
         """Fetches search interest data from Google Trends, with robust error handling."""
-        if not country_code: return None
-        try:
-            self.trends.build_payload([idea], timeframe='today 12-m', geo=country_code)
-            interest_over_time = self.trends.interest_over_time()
-            if interest_over_time.empty or idea not in interest_over_time.columns: return None
-
-            data = interest_over_time[idea]
-            change = ((data.iloc[-1] - data.iloc[0]) / data.iloc[0]) * 100 if data.iloc[0] > 0 else 0
-            return {
-                "average_interest": float(data.mean()),
-                "trend_direction": "Rising" if change > 10 else "Declining" if change < -10 else "Stable"
-            }
-        except Exception as e:
-            print(f"   Pytrends search failed (this is common, continuing without trend data): {e}")
-            return None
+        return self.get_search_trends_batch([idea], country_code).get(idea)
+
+    def get_search_trends_batch(self, ideas: List[str], country_code: str) -> Dict[str, Optional[dict]]:
+        """Fetches Google Trends data for several ideas, up to five keywords per request.
+
+        Orchestrators analysing many ideas for one country can call this once and
+        pass the result to `run(..., prefetched_trends=...)`. Trends scales interest
+        relative to the other keywords in the same payload, so `average_interest`
+        is only comparable within a chunk; `trend_direction` is unaffected.
+        """
+        unique_ideas = list(dict.fromkeys(ideas))
+        trend_data: Dict[str, Optional[dict]] = {idea: None for idea in unique_ideas}
+        if not country_code or not self.trends:
+            return trend_data
+
+        missing = []
+        for idea in unique_ideas:
+            cached = _trends_cache.get(f"{country_code}|{idea}")
+            if cached is None:
+                missing.append(idea)
+            else:
+                trend_data[idea] = cached["trend"]
+
+        for start in range(0, len(missing), _TRENDS_BATCH_SIZE):
+            chunk = missing[start:start + _TRENDS_BATCH_SIZE]
+            try:
+                self.trends.build_payload(chunk, timeframe='today 12-m', geo=country_code)
+                interest_over_time = self.trends.interest_over_time()
+                if not interest_over_time.empty:
+                    for idea in chunk:
+                        if idea in interest_over_time.columns:
+                            trend_data[idea] = self._calculate_trend_direction(interest_over_time[idea].to_numpy())
+            except Exception as e:
+                logger.warning("Pytrends search failed (this is common, continuing without trend data): %s", e)
+            for idea in chunk:
+                ttl = None if trend_data[idea] is not None else _TRENDS_MISS_TTL
+                _trends_cache.set(f"{country_code}|{idea}", {"trend": trend_data[idea]}, ttl=ttl)
+        return trend_data
+
+    @staticmethod
+    def _calculate_trend_direction(values) -> Optional[dict]:
+        """Summarizes an interest-over-time series using plain NumPy arrays (no per-call pandas overhead).
+
+        Falls back to the pure-Python calculation when NumPy is not installed.
+        """
+        if np is None:
+            values = [float(v) for v in values]
+            if not values:
+                return None
+            first, last, mean = values[0], values[-1], sum(values) / len(values)
+        else:
+            arr = np.asarray(values, dtype=np.float64)
+            if arr.size == 0:
+                return None
+            first, last, mean = arr[0], arr[-1], arr.mean()
+        change = ((last - first) / first) * 100 if first > 0 else 0
+        return {
+            "average_interest": float(mean),
+            "trend_direction": "Rising" if change > 10 else "Declining" if change < -10 else "Stable"
+        }
             
-    def _synthesize_analysis(self, idea: str, geo_data: Dict[str, Any], intelligence: Dict[str, Any]) -> dict:
+    @staticmethod
+    def _synthesize_analysis(idea: str, geo_data: Dict[str, Any], intelligence: Dict[str, Any]) -> dict:
         """Uses a powerful LLM to synthesize all gathered intelligence into a structured report."""
+        web_evidence = pack_json(
+            ({'category': category, **r}
+             for category, results in (intelligence.get('web_evidence') or {}).items() for r in results),
+            token_budget=_WEB_EVIDENCE_TOKENS,
+        )
         prompt = f"""
         You are a hyper-local market intelligence expert. Your task is to produce a deep, data-driven analysis of a startup idea's viability in a specific location.
 
         **Startup Idea:** "{idea}"
-        **Target Location:** {json.dumps(geo_data, indent=2)}
+        **Target Location:** {json_utils.dumps(geo_data)}
         
         **Intelligence Briefing (from your research team):**
         ---
         **Google Search Trends in {geo_data['country_code']} for '{idea}':**
-        {json.dumps(intelligence.get('trend_data'), indent=2)}
+        {json_utils.dumps(intelligence.get('trend_data'))}
 
         **Web Evidence:**
-        {json.dumps(intelligence.get('web_evidence'), indent=2, default=str)[:6000]}
+        {web_evidence}
         ---
 
         **Your Synthesis Task:**
@@ -215,7 +403,7 @@ class LocationAnalysisAgent(BaseAgent):
         """
         try:
             response = generate_text_with_fallback(prompt, is_json=True)
-            report_data = json.loads(response.text)
+            report_data = json_utils.loads(response.text)
             
             # Add back structured data that the LLM doesn't need to generate
             report_data.update(geo_data)
@@ -223,22 +411,62 @@ class LocationAnalysisAgent(BaseAgent):
         except Exception as e:
             return {"error": f"Failed to synthesize location analysis: {e}"}
 
-    def _self_correct_analysis(self, failed_output: dict, error: str) -> dict:
-        """Attempts to correct a malformed JSON output."""
+    @staticmethod
+    def _local_repair(failed_output: dict) -> Optional[dict]:
+        """Fixes the common, mechanical schema slips without an LLM round-trip.
+
+        A string where a list is expected is wrapped, a missing list becomes empty,
+        scores are clamped to their ranges and evidence values are stringified.
+        Returns the validated report, or None when the output needs more than that.
+        """
+        if not isinstance(failed_output, dict):
+            return None
+        repaired = dict(failed_output)
+        for key in ('key_opportunities', 'critical_risks', 'recommendations'):
+            value = repaired.get(key)
+            if isinstance(value, str):
+                repaired[key] = [value]
+            elif value is None:
+                repaired[key] = []
+        evidence = repaired.get('evidence') or []
+        if isinstance(evidence, list):
+            repaired['evidence'] = [
+                {str(k): str(v) for k, v in item.items()} if isinstance(item, dict) else {'source': str(item)}
+                for item in evidence
+            ]
+        for key, upper in (('viability_score', 100.0), ('market_readiness', 10.0)):
+            value = repaired.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                repaired[key] = min(max(float(value), 0.0), upper)
+        try:
+            return LocationAnalysisResult.model_validate(repaired).model_dump()
+        except ValidationError:
+            return None
+
+    @staticmethod
+    def _self_correct_analysis(failed_output: dict, error: str) -> dict:
+        """Attempts to correct a malformed JSON output, locally first and then via the LLM."""
+        repaired = LocationAnalysisAgent._local_repair(failed_output)
+        if repaired is not None:
+            logger.info("Self-correction successful (local repair).")
+            return repaired
+
         prompt = f"""
         You are a JSON correction expert. Your previous attempt to generate a location analysis report resulted in a validation error.
         Your task is to fix the JSON object below so it conforms to the required schema. Do not change the content, only fix the structure, types, and key names.
 
         **Validation Error:** {error}
-        **Malformed JSON Output:** {json.dumps(failed_output, indent=2)}
+        **Malformed JSON Output:** {json_utils.dumps(failed_output)}
 
         Return ONLY the corrected, valid JSON object.
         """
         try:
             resp = generate_text_with_fallback(prompt, is_json=True)
-            corrected_output = json.loads(resp.text)
+            corrected_output = json_utils.loads(resp.text)
+            if isinstance(corrected_output, dict) and "error" in corrected_output:
+                return {"error": f"Self-correction unavailable: {corrected_output['error']}"}
             validated_report = LocationAnalysisResult.model_validate(corrected_output)
-            print("   ✅ Self-correction successful.")
+            logger.info("Self-correction successful.")
             return validated_report.model_dump()
         except Exception as e:
             return {"error": f"Self-correction failed: {e}"}
\ No newline at end of file
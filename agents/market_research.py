@@ -1,81 +1,253 @@
 from .base_agent import BaseAgent
-from core.clients import generate_text_with_fallback, enhanced_web_search
-from models.schemas import MarketResearchResult
-from pydantic import ValidationError
-import json
-from typing import Dict, Any, List, Optional
+from core import json_utils
+from core.cache import PersistentCache, make_key
+from core.semantic_cache import SemanticCache
+from core.clients import gather_web_searches, generate_text_with_fallback, iter_search_results, result_key
+from core.text import compact_evidence
+from models.schemas import MarketResearchResultDict
+from pydantic import TypeAdapter, ValidationError
+import asyncio
+import logging
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import re
 
+logger = logging.getLogger(__name__)
+
+# Market-size style figures ("12.5 million", "₹300 crore", "$4B") in search snippets.
+_MARKET_FIGURE_RE = re.compile(r"\d[\d,\.\s]*(?:million|billion|crore|lakh|\bM\b|\bB\b|₹|Rs\b|INR|USD|\$)", re.IGNORECASE)
+
+# Idea keywords that steer the deterministic reports (IGNORECASE, so the idea is scanned as-is).
+_CORPORATE_IDEA_RE = re.compile(r"corporate|employee", re.IGNORECASE)
+_FINTECH_IDEA_RE = re.compile(r"finance|payment", re.IGNORECASE)
+_EDUCATION_IDEA_RE = re.compile(r"education|learning", re.IGNORECASE)
+
+# Keywords recorded as market trends when they appear in a result's title or snippet.
+_TREND_KEYWORDS = ('online', 'subscription', 'personalized', 'ai', 'machine learning', 'fitness', 'wellness', 'apps')
+# Phrases that mark a result as being about competitors.
+_COMPETITOR_CUES = ('competitor', 'alternative', 'vs ')
+# One pass over a result's lower-cased "title\nsnippet" finds every trend keyword
+# and competitor cue: the lookahead matches at each position, so overlapping
+# phrases are reported just like individual substring checks.
+_RESULT_CUES_RE = re.compile(
+    "(?=(?P<trend>" + "|".join(map(re.escape, _TREND_KEYWORDS)) + ")"
+    "|(?P<cue>" + "|".join(map(re.escape, _COMPETITOR_CUES)) + "))"
+)
+
+# Upper bound on web searches per run, however many queries the LLM proposes.
+MAX_QUERIES = 5
+RESULTS_PER_QUERY = 4
+# Unique results after which a single run stops waiting for further searches: enough
+# for the ten the deterministic synthesis reads, with headroom for the LLM prompt.
+EVIDENCE_TARGET = 12
+# Validates a report straight into the plain dict `MarketResearchResult.model_dump()` returns.
+_REPORT_ADAPTER = TypeAdapter(MarketResearchResultDict)
+# Deterministic plan used when the LLM proposes no usable queries; MAX_QUERIES entries.
+_FALLBACK_QUERY_TEMPLATES = (
+    "Overall market size for '{idea}' in {region}",
+    "Top competitors for '{idea}'",
+    "Target audience and demographics for '{idea}'",
+    "Key trends in '{idea}' industry",
+    "Regulatory or market risks for '{idea}'",
+)
+
+# Parsed LLM outputs. Query plans are keyed on (idea, location context); syntheses
+# on (idea, evidence), so fresh evidence never reuses a stale report.
+_query_plan_cache = PersistentCache("market_queries", ttl=24 * 3600)
+_synthesis_cache = PersistentCache("market_synthesis", ttl=24 * 3600)
+# Second tier for rephrased ideas: same scope (location context / evidence
+# digest), semantically similar idea text.
+_similar_query_plans = SemanticCache("market_queries", threshold=0.93, ttl=24 * 3600)
+_similar_syntheses = SemanticCache("market_synthesis", threshold=0.93, ttl=24 * 3600)
+
+# Character budget for the evidence block of the synthesis prompt, and the
+# longest snippet any one result may contribute to it.
+_EVIDENCE_CHAR_BUDGET = 12000
+_EVIDENCE_SNIPPET_CHARS = 400
+
+# Static instructions go first, as the system message, so every call shares a
+# byte-identical prefix the provider can cache; only the short per-call part
+# (idea, location, evidence) varies.
+_QUERY_SYSTEM_PROMPT = """\
+You are a market research strategist. Generate 5 targeted web search queries to analyze the market for a startup idea.
+The queries should cover:
+1.  Overall Market Size and Growth (TAM/SAM/SOM).
+2.  Direct and Indirect Competitors.
+3.  Target Audience demographics and psychographics.
+4.  Key industry trends and innovations.
+5.  Potential market risks or challenges.
+
+Return ONLY a JSON object with a single key "queries" containing a list of strings.
+"""
+
+_QUERY_PROMPT = """\
+Startup idea: "{idea}"
+{location_context}
+"""
+
+_SYNTHESIS_SYSTEM_PROMPT = """\
+You are a Senior Market Analyst at a top consulting firm (e.g., McKinsey, Bain).
+Your task is to synthesize the provided web research into a comprehensive, data-driven market analysis for a startup idea.
+
+Analyze the evidence and create a structured market research report. You MUST infer and synthesize the information. If data for a specific field is not present in the evidence, state that it is 'Not found in research'.
+
+Return ONLY a valid JSON object that strictly adheres to the 'MarketResearchResult' schema.
+- For 'market_size', provide numeric estimates if available.
+- For 'competitor_analysis', identify key players and their positioning.
+- All fields in the schema are required.
+"""
+
+_SYNTHESIS_PROMPT = """\
+Startup idea: "{idea}"
+
+**Web Research Evidence:**
+---
+{evidence}
+---
+"""
+
+def _empty_result(market_size: str, target_audience: str) -> MarketResearchResultDict:
+    """Placeholder report for failed runs, returned as a plain dict with no model round-trip."""
+    return {
+        "market_size": market_size,
+        "competitors": [],
+        "target_audience": target_audience,
+        "market_trends": [],
+        "sources": [],
+    }
+
+# Static parts of the deterministic reports. They are shared across calls, which
+# is safe because run() validates and dumps every report into fresh objects.
+_EVIDENCE_FALLBACK_COMPETITORS = (
+    {'name': 'Cure.fit / Cult.fit', 'url': 'https://www.cult.fit'},
+    {'name': 'HealthifyMe', 'url': 'https://www.healthifyme.com'},
+    {'name': 'Fittr', 'url': 'https://www.findmyfitnessapp.com'},
+)
+_EVIDENCE_MONETIZATION = (
+    'Freemium with premium subscription for personalized plans',
+    'B2B partnerships with gyms and corporate wellness',
+    'Affiliate and in-app product sales (supplements, equipment)',
+)
+_IDEA_FALLBACK_COMPETITORS = (
+    {'name': 'HealthifyMe', 'url': 'https://www.healthifyme.com'},
+    {'name': 'Cure.fit', 'url': 'https://www.cult.fit'},
+    {'name': 'Local gyms & trainers (aggregators)', 'url': ''},
+)
+_IDEA_FALLBACK_TARGET_AUDIENCE = 'Adults 18-45, health-conscious, smartphone users; urban and semi-urban segments.'
+_IDEA_FALLBACK_TRENDS = ('subscription', 'personalization', 'AI-driven recommendations', 'wearable integrations')
+_IDEA_FALLBACK_MONETIZATION = ('Freemium/subscription', 'B2B corporate plans', 'affiliate sales')
+
+
+def _format_evidence_for_prompt(evidence: Iterable[Tuple[str, Dict[str, Any]]],
+                                char_budget: int = _EVIDENCE_CHAR_BUDGET) -> str:
+    """Renders evidence as one `[title] snippet` line per result, stopping at `char_budget`."""
+    return compact_evidence((r for _query, r in evidence), char_budget, _EVIDENCE_SNIPPET_CHARS)
+
+
+def _in_query_order(completions: Iterable[Tuple[int, List[Dict[str, Any]]]]) -> Iterator[List[Dict[str, Any]]]:
+    """Re-sequences `(index, results)` completions into query order, yielding each
+    result list as soon as every earlier query has finished."""
+    pending: Dict[int, List[Dict[str, Any]]] = {}
+    next_idx = 0
+    for idx, results in completions:
+        pending[idx] = results
+        while next_idx in pending:
+            yield pending.pop(next_idx)
+            next_idx += 1
+
+
 class MarketResearchAgent(BaseAgent):
     """
     An advanced agent that dynamically generates search queries and synthesizes
     web research into a validated, structured market analysis report.
     """
+    __slots__ = ()
+
     def run(self, idea: str, location_analysis: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Executes the full, evidence-based market research pipeline.
         """
-        print(f"🔍 MarketResearchAgent: Starting advanced market research for '{idea}'")
+        logger.info("MarketResearchAgent: Starting advanced market research for '%s'", idea)
         
         try:
             # Step 1: Dynamically generate a research plan (search queries)
-            queries = self._generate_search_queries(idea, location_analysis)
-            # ensure we have a list of queries; fallback to deterministic queries if needed
-            if not queries or not isinstance(queries, list):
-                queries = [
-                    f"Overall market size for '{idea}' in {location_analysis.get('city','') if location_analysis else 'target region'}",
-                    f"Top competitors for '{idea}'",
-                    f"Target audience and demographics for '{idea}'",
-                    f"Key trends in '{idea}' industry",
-                    f"Regulatory or market risks for '{idea}'"
-                ]
+            queries = self._plan_queries(idea, location_analysis)
 
             # Step 2: Gather evidence using the generated queries
             market_evidence = self._gather_market_evidence(queries)
+        except Exception as e:
+            error_msg = f"An unexpected error occurred in MarketResearchAgent: {e}"
+            logger.error("%s", error_msg)
+            return _empty_result("exception", "exception")
+
+        return self._report_from_evidence(idea, market_evidence)
 
+    async def run_batch(self, ideas: List[Tuple[str, Optional[Dict]]],
+                        max_concurrent: int = 20) -> List[Dict[str, Any]]:
+        """Runs the pipeline for several `(idea, location_analysis)` pairs at once.
+
+        Query planning and synthesis for all ideas run concurrently, and the
+        searches of every idea share one fan-out with at most `max_concurrent`
+        in flight. Reports are returned in input order.
+        """
+        async def _plan(idea: str, location_analysis: Optional[Dict]) -> Optional[List[str]]:
+            try:
+                return await asyncio.to_thread(self._plan_queries, idea, location_analysis)
+            except Exception as e:
+                logger.error("Query planning failed for '%s': %s", idea, e)
+                return None
+
+        plans = await asyncio.gather(*(_plan(idea, loc) for idea, loc in ideas))
+        flat_queries = [q for queries in plans if queries for q in queries]
+        # Results come back in input order; each idea takes its own slice of them
+        results = await gather_web_searches(flat_queries, max_results=RESULTS_PER_QUERY, concurrency=max_concurrent)
+        offsets, start = [], 0
+        for queries in plans:
+            offsets.append(start)
+            start += len(queries or ())
+
+        async def _report(idea: str, queries: Optional[List[str]], offset: int) -> Dict[str, Any]:
+            if queries is None:
+                return _empty_result("exception", "exception")
+            evidence = self._gather_market_evidence(queries, results[offset:offset + len(queries)])
+            return await asyncio.to_thread(self._report_from_evidence, idea, evidence)
+
+        return list(await asyncio.gather(*(_report(idea, queries, offset)
+                                           for (idea, _), queries, offset in zip(ideas, plans, offsets))))
+
+    def _plan_queries(self, idea: str, location_analysis: Optional[Dict]) -> List[str]:
+        """LLM-generated search queries, or a deterministic set when none are usable."""
+        queries = self._generate_search_queries(idea, location_analysis)
+        if queries and isinstance(queries, list):
+            return queries
+        region = location_analysis.get('city', '') if location_analysis else 'target region'
+        return [template.format(idea=idea, region=region) for template in _FALLBACK_QUERY_TEMPLATES]
+
+    def _report_from_evidence(self, idea: str, market_evidence: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Synthesizes and validates the final report, degrading to a placeholder on failure."""
+        try:
             # Step 3: Synthesize the evidence into a structured report
             market_analysis_json = self._synthesize_analysis(idea, market_evidence)
             if "error" in market_analysis_json:
-                fallback = MarketResearchResult(
-                    market_size="Not available due to synthesis error",
-                    competitors=[],
-                    target_audience="Not available",
-                    market_trends=[],
-                    sources=[]
-                )
-                return fallback.model_dump()
+                return _empty_result("Not available due to synthesis error", "Not available")
             
             # Step 4: Validate and structure the final output
-            validated_report = MarketResearchResult.model_validate(market_analysis_json)
-            print("   ✅ Market research completed and validated.")
-            return validated_report.model_dump()
+            validated_report = _REPORT_ADAPTER.validate_python(market_analysis_json)
+            logger.info("Market research completed and validated.")
+            return validated_report
 
         except ValidationError as e:
             error_msg = f"Market research agent output failed Pydantic validation: {e}"
-            print(f"   ❌ {error_msg}")
-            fallback = MarketResearchResult(
-                market_size="validation_failed",
-                competitors=[],
-                target_audience="validation_failed",
-                market_trends=[],
-                sources=[]
-            )
-            return fallback.model_dump()
+            logger.error("%s", error_msg)
+            return _empty_result("validation_failed", "validation_failed")
         except Exception as e:
             error_msg = f"An unexpected error occurred in MarketResearchAgent: {e}"
-            print(f"   ❌ {error_msg}")
-            fallback = MarketResearchResult(
-                market_size="exception",
-                competitors=[],
-                target_audience="exception",
-                market_trends=[],
-                sources=[]
-            )
-            return fallback.model_dump()
+            logger.error("%s", error_msg)
+            return _empty_result("exception", "exception")
 
     def _generate_search_queries(self, idea: str, location_analysis: Optional[Dict]) -> dict:
         """Uses a fast LLM to create a set of targeted search queries."""
-        print("   -> Generating dynamic search queries...")
+        logger.debug("Generating dynamic search queries...")
         
         location_context = ""
         if location_analysis:
@@ -86,27 +258,25 @@ class MarketResearchAgent(BaseAgent):
                 loc = location_analysis.get('normalized_location', {})
             location_context = f"The target market is specifically in {loc.get('city', '')}, {loc.get('region', '')}, {loc.get('country_code', '')}."
 
-        prompt = f"""
-        You are a market research strategist. Generate 5 targeted web search queries to analyze the market for the startup idea: "{idea}".
-        {location_context}
-        The queries should cover:
-        1.  Overall Market Size and Growth (TAM/SAM/SOM).
-        2.  Direct and Indirect Competitors.
-        3.  Target Audience demographics and psychographics.
-        4.  Key industry trends and innovations.
-        5.  Potential market risks or challenges.
-
-        Return ONLY a JSON object with a single key "queries" containing a list of strings.
-        """
+        cache_key = make_key([idea, location_context])
+        cached_queries = _query_plan_cache.get(cache_key) or _similar_query_plans.get(idea, scope=location_context)
+        if cached_queries:
+            return cached_queries
+
+        prompt = _QUERY_PROMPT.format(idea=idea, location_context=location_context)
         try:
-            resp = generate_text_with_fallback(prompt, is_json=True)
-            parsed = json.loads(resp.text)
+            resp = generate_text_with_fallback(prompt, is_json=True, system=_QUERY_SYSTEM_PROMPT, fast=True)
+            parsed = json_utils.loads(resp.text)
             # If LLM wrapper returned an error, fall through to deterministic list
             if isinstance(parsed, dict) and parsed.get('error'):
                 raise ValueError('LLM unavailable')
             # Expect parsed to be {'queries': [...]}
             if isinstance(parsed, dict) and isinstance(parsed.get('queries'), list):
-                return parsed.get('queries')
+                queries = self._bounded_queries(parsed['queries'])
+                if queries:
+                    _query_plan_cache.set(cache_key, queries)
+                    _similar_query_plans.set(idea, queries, scope=location_context)
+                return queries
         except Exception:
             # Deterministic fallback: build basic queries from idea and location
             location_text = ''
@@ -124,52 +294,102 @@ class MarketResearchAgent(BaseAgent):
                 f"Potential market risks or challenges for '{idea}'{location_text}"
             ]
 
-    def _gather_market_evidence(self, queries: list[str]) -> str:
-        """Executes the search queries and returns aggregated raw search results."""
-        print(f"   -> Gathering evidence from {len(queries)} web searches...")
-        evidence_results = []
-        for query in queries:
-            # allow caller to include a country hint in the query tuple
-            results = enhanced_web_search(query, max_results=4)
-            if results:
-                # attach the query so consumers know where it came from
-                for r in results:
-                    r['_query'] = query
-                evidence_results.extend(results)
-
-        return evidence_results
-
-    def _deterministic_synthesis(self, idea: str, evidence_results: list) -> dict:
+    @staticmethod
+    def _bounded_queries(candidates: List[Any]) -> List[str]:
+        """Distinct non-empty query strings, case-insensitively, stopping at MAX_QUERIES."""
+        queries: List[str] = []
+        seen = set()
+        for candidate in candidates:
+            if not isinstance(candidate, str):
+                continue
+            query = candidate.strip()
+            key = query.lower()
+            if not query or key in seen:
+                continue
+            seen.add(key)
+            queries.append(query)
+            if len(queries) >= MAX_QUERIES:
+                break
+        return queries
+
+    def _gather_market_evidence(self, queries: list[str],
+                                results_per_query: Optional[List[List[Dict[str, Any]]]] = None
+                                ) -> List[Tuple[str, Dict[str, Any]]]:
+        """Executes the search queries and returns up to EVIDENCE_TARGET `(query, result)` pairs.
+
+        The query travels alongside each result rather than being written into
+        it, so result dicts are passed on exactly as the search returned them.
+        `results_per_query`, when given, holds results already fetched for
+        `queries` (in query order), e.g. by a batch fan-out; they are capped and
+        ordered the same way.
+        """
+        if results_per_query is not None:
+            return list(islice(self._iter_evidence(queries, results_per_query), EVIDENCE_TARGET))
+        logger.debug("Gathering evidence from up to %s web searches...", len(queries))
+        # The searches run concurrently, but evidence is assembled in query order so
+        # it stays deterministic. Once EVIDENCE_TARGET unique results are in hand,
+        # searches that have not started yet are cancelled.
+        searches = iter_search_results(queries, max_results=RESULTS_PER_QUERY)
+        try:
+            return list(islice(self._iter_evidence(queries, _in_query_order(searches)), EVIDENCE_TARGET))
+        finally:
+            searches.close()
+
+    @staticmethod
+    def _iter_evidence(queries: List[str], results_per_query: Iterable[List[Dict[str, Any]]]
+                       ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yields each result paired with its query. Overlapping queries often
+        return the same page; only its first occurrence is kept so it is not paid
+        for twice in the prompt."""
+        seen = set()
+        for query, results in zip(queries, results_per_query):
+            for r in results:
+                key = result_key(r)
+                if key not in seen:
+                    seen.add(key)
+                    yield query, r
+
+    def _deterministic_synthesis(self, idea: str, evidence_results: Iterable[Tuple[str, Dict[str, Any]]]) -> dict:
         """Produce a conservative, evidence-based market research result from raw search results.
         This avoids hallucination when an LLM is unavailable.
         """
         # Basic heuristics: infer competitors from top domains and detect numeric market mentions
         competitors = []
+        seen_competitors = set()
         market_trends = set()
         sources = []
         numeric_mentions = []
 
-        for r in evidence_results[:10]:
+        for _query, r in islice(evidence_results, 10):
             title = r.get('title') or r.get('url') or ''
             url = r.get('url')
             snippet = (r.get('snippet') or r.get('content') or '')
             if url:
                 sources.append(url)
-            # competitor heuristic: pages that include 'competitor' or 'vs' or 'alternative'
-            if 'competitor' in snippet.lower() or 'vs ' in title.lower() or 'alternative' in snippet.lower():
-                competitors.append({'name': title[:120], 'url': url})
-            # trend keywords
-            for kw in ('online', 'subscription', 'personalized', 'ai', 'machine learning', 'fitness', 'wellness', 'apps'):
-                if kw in snippet.lower() or kw in title.lower():
-                    market_trends.add(kw)
+            # Single scan for trend keywords and competitor cues. The competitor
+            # heuristic reads 'vs ' in the title and 'competitor'/'alternative' in the snippet.
+            title_lower = title.lower()
+            is_competitor_page = False
+            for m in _RESULT_CUES_RE.finditer(f"{title_lower}\n{snippet.lower()}"):
+                trend = m.group('trend')
+                if trend:
+                    market_trends.add(trend)
+                elif (m.group('cue') == 'vs ') == (m.start() < len(title_lower)):
+                    is_competitor_page = True
+            if is_competitor_page:
+                name = title[:120]
+                # The same page often comes back for several queries; keep one entry per name.
+                if name not in seen_competitors:
+                    seen_competitors.add(name)
+                    competitors.append({'name': name, 'url': url})
             # numeric extraction (simple)
-            nums = re.findall(r"\d[\d,\.\s]*(?:million|billion|crore|lakh|\bM\b|\bB\b|₹|Rs\b|INR|USD|\$)", snippet, flags=re.IGNORECASE)
+            nums = _MARKET_FIGURE_RE.findall(snippet)
             if nums:
                 numeric_mentions.extend(nums)
 
         # Infer target audience from idea keywords
         target_audience = 'General consumers interested in fitness and wellness (e.g., 18-45, gym-goers, health-conscious adults)'
-        if 'corporate' in idea.lower() or 'employee' in idea.lower():
+        if _CORPORATE_IDEA_RE.search(idea):
             target_audience = 'Corporate wellness programs / employees'
 
         # Heuristic TAM/SAM/SOM guidance
@@ -177,67 +397,51 @@ class MarketResearchAgent(BaseAgent):
         if numeric_mentions:
             market_size = f"Estimated figures mentioned in sources: {numeric_mentions[:3]}"
 
-        # Monetization heuristics
-        monetization = [
-            'Freemium with premium subscription for personalized plans',
-            'B2B partnerships with gyms and corporate wellness',
-            'Affiliate and in-app product sales (supplements, equipment)'
-        ]
+        # Canonical keyword order (rather than set order) keeps the report stable across runs
+        trends = [kw for kw in _TREND_KEYWORDS if kw in market_trends]
 
         concise_summary = (
-            f"Conservative synthesis: target audience={target_audience}; trends={', '.join(list(market_trends)[:4]) or 'general fitness/ai'};"
-            f" monetization options={', '.join(monetization[:2])}."
+            f"Conservative synthesis: target audience={target_audience}; trends={', '.join(trends[:4]) or 'general fitness/ai'};"
+            f" monetization options={', '.join(_EVIDENCE_MONETIZATION[:2])}."
         )
 
         if not competitors:
             # Add known, high-level competitors for fitness/diet app space
-            competitors = [
-                {'name': 'Cure.fit / Cult.fit', 'url': 'https://www.cult.fit'},
-                {'name': 'HealthifyMe', 'url': 'https://www.healthifyme.com'},
-                {'name': 'Fittr', 'url': 'https://www.findmyfitnessapp.com'}
-            ]
+            competitors = list(_EVIDENCE_FALLBACK_COMPETITORS)
 
         return {
             'market_size': market_size,
             'competitors': competitors,
             'target_audience': target_audience,
-            'market_trends': list(market_trends)[:6],
+            'market_trends': trends[:6],
             'sources': sources[:10],
-            'monetization': monetization,
+            'monetization': list(_EVIDENCE_MONETIZATION),
             'concise_summary': concise_summary
         }
 
-    def _synthesize_analysis(self, idea: str, market_evidence: str) -> dict:
+    def _synthesize_analysis(self, idea: str, market_evidence: List[Tuple[str, Dict[str, Any]]]) -> dict:
         """Uses a powerful LLM to synthesize the gathered evidence into a structured report."""
-        
-        prompt = f"""
-        You are a Senior Market Analyst at a top consulting firm (e.g., McKinsey, Bain).
-        Your task is to synthesize the provided web research into a comprehensive, data-driven market analysis for the startup idea: "{idea}".
-
-        **Web Research Evidence:**
-        ---
-        {market_evidence[:12000]}
-        ---
-
-        **Your Task:**
-        Analyze the evidence and create a structured market research report. You MUST infer and synthesize the information. If data for a specific field is not present in the evidence, state that it is 'Not found in research'.
-
-        Return ONLY a valid JSON object that strictly adheres to the 'MarketResearchResult' schema.
-        - For 'market_size', provide numeric estimates if available.
-        - For 'competitor_analysis', identify key players and their positioning.
-        - All fields in the schema are required.
-        """
+        cache_key = make_key([idea, market_evidence])
+        evidence_scope = make_key(market_evidence)
+        cached_report = _synthesis_cache.get(cache_key) or _similar_syntheses.get(idea, scope=evidence_scope)
+        if cached_report:
+            return cached_report
+
+        prompt = _SYNTHESIS_PROMPT.format(idea=idea, evidence=_format_evidence_for_prompt(market_evidence))
         
         try:
             # Use a powerful model for high-quality synthesis
-            response = generate_text_with_fallback(prompt, is_json=True)
-            parsed = json.loads(response.text)
+            response = generate_text_with_fallback(prompt, is_json=True, system=_SYNTHESIS_SYSTEM_PROMPT)
+            parsed = json_utils.loads(response.text)
             # If the LLM wrapper returned an error fallback, use deterministic synthesis instead
             if isinstance(parsed, dict) and parsed.get('error'):
                 if isinstance(market_evidence, list) and market_evidence:
                     return self._deterministic_synthesis(idea, market_evidence)
                 # No LLM and no evidence -> return a conservative, domain-aware fallback
                 return self._fallback_market_from_idea(idea, None)
+            if isinstance(parsed, dict):
+                _synthesis_cache.set(cache_key, parsed)
+                _similar_syntheses.set(idea, parsed, scope=evidence_scope)
             return parsed
         except Exception as e:
             # Deterministic fallback using raw evidence if available
@@ -253,12 +457,12 @@ class MarketResearchAgent(BaseAgent):
         """Create a conservative, domain-aware market research fallback when no evidence is available.
         Uses idea keywords and location to pick sensible defaults (currency, TAM heuristic, competitors).
         """
-        print("   -> Using deterministic fallback for market research (no LLM / web evidence)")
+        logger.debug("Using deterministic fallback for market research (no LLM / web evidence)")
         # Infer industry from idea keywords
         industry = 'consumer fitness & wellness'
-        if 'finance' in idea.lower() or 'payment' in idea.lower():
+        if _FINTECH_IDEA_RE.search(idea):
             industry = 'fintech'
-        if 'education' in idea.lower() or 'learning' in idea.lower():
+        if _EDUCATION_IDEA_RE.search(idea):
             industry = 'education'
 
         country = None
@@ -280,28 +484,18 @@ class MarketResearchAgent(BaseAgent):
             f"{tam_text} SAM: Urban, tech-enabled users in target region. SOM: pilotable cohort (0.5-3% adoption) of active users."
         )
 
-        # Reasonable default competitors for broad consumer apps
-        competitors = [
-            {'name': 'HealthifyMe', 'url': 'https://www.healthifyme.com'},
-            {'name': 'Cure.fit', 'url': 'https://www.cult.fit'},
-            {'name': 'Local gyms & trainers (aggregators)', 'url': ''}
-        ]
-
-        target_audience = 'Adults 18-45, health-conscious, smartphone users; urban and semi-urban segments.'
-        market_trends = ['subscription', 'personalization', 'AI-driven recommendations', 'wearable integrations']
-        monetization = ['Freemium/subscription', 'B2B corporate plans', 'affiliate sales']
-
         concise_summary = (
-            f"Fallback market synthesis for {industry}: {target_audience}. Trends: {', '.join(market_trends[:3])}. "
-            f"Monetization: {monetization[0]}."
+            f"Fallback market synthesis for {industry}: {_IDEA_FALLBACK_TARGET_AUDIENCE}. "
+            f"Trends: {', '.join(_IDEA_FALLBACK_TRENDS[:3])}. Monetization: {_IDEA_FALLBACK_MONETIZATION[0]}."
         )
 
+        # Reasonable default competitors, audience and trends for broad consumer apps
         return {
             'market_size': market_size,
-            'competitors': competitors,
-            'target_audience': target_audience,
-            'market_trends': market_trends,
+            'competitors': list(_IDEA_FALLBACK_COMPETITORS),
+            'target_audience': _IDEA_FALLBACK_TARGET_AUDIENCE,
+            'market_trends': list(_IDEA_FALLBACK_TRENDS),
             'sources': [],
-            'monetization': monetization,
+            'monetization': list(_IDEA_FALLBACK_MONETIZATION),
             'concise_summary': concise_summary
         }
\ No newline at end of file
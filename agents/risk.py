@@ -1,24 +1,89 @@
 from .base_agent import BaseAgent
-from core.clients import generate_text_with_fallback, enhanced_web_search
+from core import json_utils
+from core.cache import PersistentCache, SingleFlight, make_key
+from core.clients import generate_text_with_fallback, search_many
+from core.semantic_cache import SemanticCache
+from core.text import count_tokens, normalize_whitespace, pack_json
 from models.schemas import RiskResult
 from pydantic import ValidationError
-import json
-from typing import Dict, Any, List, Optional
+import logging
+from typing import Dict, Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Validated reports for semantically similar ideas assessed against the same market and
+# location context. Exact prompt repeats are already served by the LLM response cache;
+# this tier also catches rephrased ideas and skips the evidence searches for them.
+_similar_risk_reports = SemanticCache("risk_assessment", threshold=0.93, ttl=24 * 3600)
+# Rendered risk evidence per (idea, country). Failure modes and regulation change over
+# days, not minutes, so re-runs skip the three searches for a day.
+_risk_evidence_cache = PersistentCache("risk_evidence", ttl=24 * 3600)
+# Joins a caller to evidence gathering already in flight for the same idea and country,
+# e.g. a prefetch that outlived its timeout.
+_evidence_calls = SingleFlight()
+
+# Prompt tokens allotted to each risk query's search results (whole results only),
+# and to the evidence section as a whole (whole query blocks only).
+_EVIDENCE_TOKENS_PER_QUERY = 600
+_EVIDENCE_TOKENS = 1500
+
+_FALLBACK_SUMMARY = 'Deterministic fallback risk assessment for consumer fitness/wellness apps'
+
+# Risk-consultant instructions, sent as the system message.
+_RISK_SYSTEM_PROMPT = """\
+You are a senior risk management expert at a top global consulting firm.
+Your task is to produce a comprehensive, data-driven risk assessment for a startup idea.
+
+Analyze all the provided intelligence to create a structured risk report. You MUST infer, synthesize, and quantify the risks.
+-   Use the provided risk framework (Market, Financial, Technical, etc.).
+-   Assign a `likelihood` and `impact` (Low, Medium, High) for each risk.
+-   Provide a concrete `mitigation` strategy and a `validation_experiment` for each.
+-   Calculate an `overall_risk_score` (0-100) based on the severity of the identified risks.
+
+Return ONLY a valid JSON object that strictly adheres to the 'RiskResult' Pydantic schema. All fields are required.
+"""
+
+_RISK_PROMPT = """\
+Startup idea: "{idea}"
+
+**Provided Intelligence Briefing:**
+---
+**General Market Analysis:**
+{market}
+
+**Hyper-Local Context:**
+{location}
+
+**Targeted Research on Common Risks:**
+{evidence}
+---
+"""
 
 class RiskAgent(BaseAgent):
     """
     An advanced agent that performs a comprehensive, evidence-based risk assessment
     by synthesizing market, location, and targeted risk research.
     """
-    def run(self, idea: str, market_research_data: dict, location_analysis: Optional[dict] = None) -> Dict[str, Any]:
+    def run(self, idea: str, market_research_data: dict, location_analysis: Optional[dict] = None,
+            risk_evidence: Optional[str] = None) -> Dict[str, Any]:
         """
         Executes the full, evidence-based risk assessment pipeline.
+
+        `risk_evidence` is the output of `gather_evidence` when the caller has
+        already gathered it (e.g. concurrently with market research); otherwise the
+        searches run here.
         """
-        print(f"⚠️  RiskAgent: Starting advanced risk assessment for '{idea}'")
+        logger.info("RiskAgent: Starting advanced risk assessment for '%s'", idea)
+        context_scope = make_key([market_research_data, location_analysis])
+        cached_report = _similar_risk_reports.get(idea, scope=context_scope)
+        if cached_report:
+            logger.info("Risk assessment served from cache.")
+            return cached_report
         
         try:
             # Step 1: Gather additional evidence on common risks for this type of idea
-            risk_evidence = self._gather_risk_evidence(idea, location_analysis)
+            if risk_evidence is None:
+                risk_evidence = self.gather_evidence(idea, location_analysis)
 
             # Step 2: Synthesize all available data into a structured risk report
             risk_analysis_json = self._synthesize_risk_analysis(
@@ -38,13 +103,18 @@ class RiskAgent(BaseAgent):
                 return fallback.model_dump()
 
             # Step 3: Validate and structure the final output
-            validated_report = RiskResult.model_validate(risk_analysis_json)
-            print("   ✅ Risk assessment completed and validated.")
-            return validated_report.model_dump()
+            validated_report = (risk_analysis_json if isinstance(risk_analysis_json, RiskResult)
+                                else RiskResult.model_validate(risk_analysis_json))
+            logger.info("Risk assessment completed and validated.")
+            result = validated_report.model_dump()
+            # Only LLM assessments are worth reusing; the canned fallback is cheap to rebuild.
+            if result['summary'] != _FALLBACK_SUMMARY:
+                _similar_risk_reports.set(idea, result, scope=context_scope)
+            return result
 
         except ValidationError as e:
             error_msg = f"Risk agent output failed Pydantic validation: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = RiskResult(
                 summary="Risk assessment unavailable (validation_error)",
                 overall_risk_score=50.0,
@@ -55,7 +125,7 @@ class RiskAgent(BaseAgent):
             return fallback.model_dump()
         except Exception as e:
             error_msg = f"An unexpected error occurred in RiskAgent: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             # Deterministic fallback using simple heuristics
             risks = [
                 {"title": "Market adoption", "likelihood": "Medium", "impact": "High", "mitigation": "Run local pilots and gather user feedback"},
@@ -71,62 +141,81 @@ class RiskAgent(BaseAgent):
             )
             return fallback.model_dump()
 
-    def _gather_risk_evidence(self, idea: str, location_analysis: Optional[Dict]) -> str:
-        """Performs targeted web searches for risks related to the startup idea."""
-        print("   -> Researching common risks and failure modes...")
-        
-        country_code = location_analysis.get("normalized_location", {}).get("country_code", "US") if location_analysis else "US"
-        
+    def gather_evidence(self, idea: str, location_analysis: Optional[Dict]) -> str:
+        """Performs targeted web searches for risks related to the startup idea.
+
+        Needs only the idea and location, so callers can run it alongside market
+        research and pass the result to `run` as `risk_evidence`.
+        """
+        # LocationAnalysisAgent reports `country_code` at the top level; older callers nest it.
+        location = location_analysis or {}
+        country_code = (location.get("country_code")
+                        or location.get("normalized_location", {}).get("country_code")
+                        or "US").upper()
+        cache_key = make_key([normalize_whitespace(idea.lower()), country_code])
+        cached_evidence = _risk_evidence_cache.get(cache_key)
+        if cached_evidence is not None:
+            return cached_evidence
+        return _evidence_calls.do(cache_key, lambda: self._search_risk_evidence(idea, country_code, cache_key))
+
+    def _search_risk_evidence(self, idea: str, country_code: str, cache_key: str) -> str:
+        logger.debug("Researching common risks and failure modes...")
         queries = [
             f"common risks for '{idea}' startups",
             f"why '{idea}' businesses fail",
             f"regulatory challenges for '{idea}' in {country_code}"
         ]
         
-        evidence = []
-        for query in queries:
-            results = enhanced_web_search(query, max_results=2, country=country_code.lower())
-            if results:
-                evidence.append(f"Evidence for '{query}':\n" + json.dumps(results, indent=2))
-        
-        return "\n\n".join(evidence)
+        # The three searches are independent, so they run concurrently; results keep query order.
+        # Each query's results are packed whole into a token budget, so the prompt never
+        # carries JSON cut off mid-value.
+        all_results = search_many(queries, max_results=2, country=country_code.lower())
+        blocks: List[str] = []
+        used = 0
+        for query, results in zip(queries, all_results):
+            evidence = pack_json(results, token_budget=_EVIDENCE_TOKENS_PER_QUERY)
+            if evidence == "[]":
+                continue
+            block = f"Evidence for '{query}':\n{evidence}"
+            cost = count_tokens(block)
+            if used + cost > _EVIDENCE_TOKENS:
+                break
+            blocks.append(block)
+            used += cost
+        rendered = "\n\n".join(blocks)
+        if rendered:
+            _risk_evidence_cache.set(cache_key, rendered)
+        return rendered
 
-    def _synthesize_risk_analysis(self, idea: str, market_data: dict, location_data: Optional[dict], risk_evidence: str) -> dict:
-        """Uses a powerful LLM to synthesize all gathered data into a structured risk report."""
-        
-        prompt = f"""
-        You are a senior risk management expert at a top global consulting firm.
-        Your task is to produce a comprehensive, data-driven risk assessment for the startup idea: "{idea}".
-
-        **Provided Intelligence Briefing:**
-        ---
-        **General Market Analysis:**
-        {json.dumps(market_data, indent=2, default=str)}
-
-        **Hyper-Local Context:**
-        {json.dumps(location_data, indent=2, default=str)}
-
-        **Targeted Research on Common Risks:**
-        {risk_evidence[:5000]}
-        ---
-
-        **Your Synthesis Task:**
-        Analyze all the provided intelligence to create a structured risk report. You MUST infer, synthesize, and quantify the risks.
-        -   Use the provided risk framework (Market, Financial, Technical, etc.).
-        -   Assign a `likelihood` and `impact` (Low, Medium, High) for each risk.
-        -   Provide a concrete `mitigation` strategy and a `validation_experiment` for each.
-        -   Calculate an `overall_risk_score` (0-100) based on the severity of the identified risks.
-
-        Return ONLY a valid JSON object that strictly adheres to the 'RiskResult' Pydantic schema. All fields are required.
+    def _synthesize_risk_analysis(self, idea: str, market_data: dict, location_data: Optional[dict],
+                                  risk_evidence: str) -> Union[RiskResult, Dict[str, Any]]:
+        """Uses a powerful LLM to synthesize all gathered data into a structured risk report.
+
+        Returns the validated `RiskResult` when the reply matches the schema as-is;
+        otherwise the parsed dict (possibly an `{"error": ...}` payload) for `run` to check.
         """
         
+        prompt = _RISK_PROMPT.format(
+            idea=idea,
+            market=json_utils.dumps(market_data),
+            location=json_utils.dumps(location_data),
+            evidence=risk_evidence,
+        )
+        
         try:
             # Use a powerful model for this complex synthesis task
-            response = generate_text_with_fallback(prompt, is_json=True)
-            return json.loads(response.text)
+            response = generate_text_with_fallback(prompt, is_json=True, system=_RISK_SYSTEM_PROMPT)
+            try:
+                # Parse and validate the raw response in a single pydantic-core pass
+                return RiskResult.model_validate_json(response.text)
+            except ValidationError:
+                # Slow path: an LLM error payload, an object wrapped in a fence or prose
+                # (providers without a strict JSON mode), or off-schema output that
+                # run() reports as a validation failure
+                return json_utils.extract_object(response.text)
         except Exception as e:
             # Deterministic, domain-aware fallback when LLM and/or web evidence is unavailable
-            print("   -> Using deterministic fallback for risk analysis (no LLM / web evidence)")
+            logger.debug("Using deterministic fallback for risk analysis (no LLM / web evidence)")
             # Base risks for consumer fitness/wellness apps
             risks = [
                 {
@@ -154,7 +243,7 @@ class RiskAgent(BaseAgent):
             overall_score = 55.0
             recommendations = [r['mitigation'] for r in risks]
             return {
-                'summary': 'Deterministic fallback risk assessment for consumer fitness/wellness apps',
+                'summary': _FALLBACK_SUMMARY,
                 'overall_risk_score': overall_score,
                 'risk_level': 'medium',
                 'risks': risks,
@@ -1,10 +1,42 @@
 from .base_agent import BaseAgent
-from core.clients import generate_text_with_fallback, enhanced_web_search
+from core import json_utils
+from core.clients import generate_text_with_fallback, gather_web_searches
+from core.text import compact_evidence
 from models.schemas import TechnicalFeasibilityResult
 from pydantic import ValidationError
-import json
+import asyncio
+import logging
 from typing import Dict, Any, List, Optional
 
+logger = logging.getLogger(__name__)
+
+# Characters of search evidence handed to the synthesis prompt.
+_EVIDENCE_CHAR_BUDGET = 12000
+
+# CTO review instructions; `_SYNTHESIS_PROMPT` carries the idea and research briefing.
+_SYNTHESIS_SYSTEM_PROMPT = """\
+You are an experienced Chief Technology Officer (CTO) and startup advisor.
+Your task is to create a comprehensive and realistic technical feasibility plan for a startup idea, based on research from your team.
+
+Based on the provided research, create a detailed technical assessment.
+-   Recommend a modern, scalable technology stack.
+-   Outline a realistic development timeline in weeks for an MVP.
+-   Estimate development, infrastructure, and maintenance costs.
+-   Define the core team required to build the MVP.
+-   Provide an overall feasibility rating.
+
+Return ONLY a valid JSON object that strictly adheres to the 'TechnicalFeasibilityResult' Pydantic schema. All fields are required.
+"""
+
+_SYNTHESIS_PROMPT = """\
+Startup idea: "{idea}"
+
+Intelligence Briefing from Research Team:
+---
+{evidence}
+---
+"""
+
 class TechnicalFeasibilityAgent(BaseAgent):
     """
     An advanced agent that provides a realistic technical assessment based on
@@ -15,7 +47,7 @@ class TechnicalFeasibilityAgent(BaseAgent):
         """
         Executes the full, evidence-based technical feasibility pipeline.
         """
-        print(f"🛠️  TechnicalFeasibilityAgent: Starting advanced analysis for '{idea}'")
+        logger.info("TechnicalFeasibilityAgent: Starting advanced analysis for '%s'", idea)
         
         try:
             # Step 1: Gather comprehensive technical evidence
@@ -39,12 +71,12 @@ class TechnicalFeasibilityAgent(BaseAgent):
 
             # Step 3: Validate and structure the final output
             validated_report = TechnicalFeasibilityResult.model_validate(tech_analysis_json)
-            print("   ✅ Technical feasibility analysis completed and validated.")
+            logger.info("Technical feasibility analysis completed and validated.")
             return validated_report.model_dump()
 
         except ValidationError as e:
             error_msg = f"Technical feasibility agent output failed Pydantic validation: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             # Schema-compliant fallback
             fallback = TechnicalFeasibilityResult(
                 key_challenges=[],
@@ -56,7 +88,7 @@ class TechnicalFeasibilityAgent(BaseAgent):
             return fallback.model_dump()
         except Exception as e:
             error_msg = f"An unexpected error occurred in TechnicalFeasibilityAgent: {e}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             fallback = TechnicalFeasibilityResult(
                 key_challenges=[],
                 suggested_stack={"note": "exception"},
@@ -68,7 +100,7 @@ class TechnicalFeasibilityAgent(BaseAgent):
 
     def _gather_technical_evidence(self, idea: str, location_analysis: Optional[Dict]) -> str:
         """Performs a consolidated web search for all technical aspects."""
-        print("   -> Researching tech stack, challenges, and talent availability...")
+        logger.debug("Researching tech stack, challenges, and talent availability...")
         
         country_code = location_analysis.get("normalized_location", {}).get("country_code", "US") if location_analysis else "US"
         city = location_analysis.get("normalized_location", {}).get("city", "") if location_analysis else ""
@@ -80,40 +112,34 @@ class TechnicalFeasibilityAgent(BaseAgent):
             f"hiring software developers for '{idea}' in {city}, {country_code}"
         ]
         
+        # Agents run in worker threads, so a private event loop is safe here. At
+        # most 5 searches are in flight; results come back in query order.
+        all_results = asyncio.run(
+            gather_web_searches(queries, max_results=2, country=country_code.lower(), concurrency=5)
+        )
+        # Compact `[title] snippet` lines instead of raw result JSON, sharing one budget across queries
         evidence = []
-        for query in queries:
-            results = enhanced_web_search(query, max_results=2, country=country_code.lower())
-            if results:
-                evidence.append(f"Evidence for '{query}':\n" + json.dumps(results, indent=2))
+        budget = _EVIDENCE_CHAR_BUDGET
+        for query, results in zip(queries, all_results):
+            if not results:
+                continue
+            header = f"Evidence for '{query}':\n"
+            lines = compact_evidence(results, char_budget=budget - len(header))
+            if not lines:
+                break
+            evidence.append(header + lines)
+            budget -= len(evidence[-1]) + 2
         
         return "\n\n".join(evidence)
 
     def _synthesize_technical_analysis(self, idea: str, tech_evidence: str) -> dict:
         """Uses a powerful LLM to synthesize gathered evidence into a structured technical plan."""
         
-        prompt = f"""
-        You are an experienced Chief Technology Officer (CTO) and startup advisor.
-        Your task is to create a comprehensive and realistic technical feasibility plan for the startup idea: "{idea}".
-
-        **Intelligence Briefing from Research Team:**
-        ---
-        {tech_evidence[:12000]}
-        ---
-
-        **Your Synthesis Task:**
-        Based on the provided research, create a detailed technical assessment.
-        -   Recommend a modern, scalable technology stack.
-        -   Outline a realistic development timeline in weeks for an MVP.
-        -   Estimate development, infrastructure, and maintenance costs.
-        -   Define the core team required to build the MVP.
-        -   Provide an overall feasibility rating.
-
-        Return ONLY a valid JSON object that strictly adheres to the 'TechnicalFeasibilityResult' Pydantic schema. All fields are required.
-        """
+        prompt = _SYNTHESIS_PROMPT.format(idea=idea, evidence=tech_evidence[:_EVIDENCE_CHAR_BUDGET])
         
         try:
-            response = generate_text_with_fallback(prompt, is_json=True)
-            parsed = json.loads(response.text)
+            response = generate_text_with_fallback(prompt, is_json=True, system=_SYNTHESIS_SYSTEM_PROMPT)
+            parsed = json_utils.loads(response.text)
             # If LLM wrapper returned an error fallback, use deterministic rich fallback
             if isinstance(parsed, dict) and parsed.get('error'):
                 return self._fallback_technical_from_idea(idea, None)
@@ -124,7 +150,7 @@ class TechnicalFeasibilityAgent(BaseAgent):
 
     def _fallback_technical_from_idea(self, idea: str, location_analysis: Optional[Dict] = None) -> dict:
         """Create a deterministic, domain-aware technical fallback when synthesis is unavailable."""
-        print("   -> Using deterministic fallback for technical feasibility (no LLM / web evidence)")
+        logger.debug("Using deterministic fallback for technical feasibility (no LLM / web evidence)")
         # Simple industry-driven stack choices
         stack = {
             'frontend': ['React (web) and/or Flutter (mobile)'],
@@ -1,12 +1,68 @@
 """Enhanced UserPersonaAgent with real demographic data and validation."""
 
 from .base_agent import BaseAgent
-import time
-from core.clients import generate_text, enhanced_web_search, get_location_data
+from core.clients import generate_json, generate_text, get_location_data, iter_search_results, result_key
+from core import json_utils
+from core.text import elide
 from models.schemas import UserPersonaResult, UserPersonaDetail
-import json
 from typing import Dict, Any, List
+import logging
 import re
+import statistics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Demographic figures pulled from search snippets. Compiled once with IGNORECASE
+# so snippets are scanned as-is instead of lower-casing a copy per result.
+_AGE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'average age[^\d]*(\d+)',
+    r'aged[^\d]*(\d+)[^\d]*to[^\d]*(\d+)',
+    r'age group[^\d]*(\d+)[^\d]*-\s*(\d+)',
+))
+# Income figures capture an optional unit from the same span as the number, so
+# "12 lakh" scales correctly without re-scanning the snippet for unit words.
+_INCOME_UNIT = r'(?:\s*(k|thousand|lakhs?|crores?|cr|million|mn)\b)?'
+_INCOME_PATTERNS = tuple(re.compile(p + _INCOME_UNIT, re.IGNORECASE) for p in (
+    r'average income[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'median income[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+    r'salary[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+))
+_MULT = {
+    "k": 1e3, "thousand": 1e3,
+    "lakh": 1e5, "lakhs": 1e5,
+    "cr": 1e7, "crore": 1e7, "crores": 1e7,
+    "million": 1e6, "mn": 1e6,
+}
+
+# Behavioural routing: group 1 flags a pain point, group 2 a motivation. One
+# case-insensitive scan replaces two lists of substring checks per snippet.
+_BEHAVIOR_ROUTER = re.compile(
+    r"(frustrated|difficult|challenge|problem|issue|pain point)|(want|need|desire|looking for|goal)",
+    re.IGNORECASE,
+)
+_PAIN_POINT, _MOTIVATION = 1, 2
+
+# Research queries, filled with str.format(idea=, country_code=, city=, region=).
+_DEMOGRAPHIC_QUERY_TEMPLATES = (
+    "target audience demographics {idea} {country_code}",
+    "average income {city} {region}",
+    "tech adoption rates {country_code}",
+    "occupation statistics {city} {region}",
+    "age distribution {idea} users {country_code}",
+)
+_BEHAVIOR_QUERY_TEMPLATES = (
+    "user pain points {idea}",
+    "customer challenges {idea} {country_code}",
+    "user behavior patterns {idea}",
+    "what do users want from {idea}",
+)
+
+_FITNESS_IDEA_RE = re.compile(r"fitness|wellness|workout|diet|health|gym", re.IGNORECASE)
 
 
 class UserPersonaAgent(BaseAgent):
@@ -17,7 +73,7 @@ class UserPersonaAgent(BaseAgent):
     
     def run(self, idea: str, market_research_data: Dict[str, Any] = None, 
             location: Dict[str, Any] = None) -> Dict[str, Any]:
-        print(f"👤 UserPersonaAgent: Creating realistic user persona for '{idea}'")
+        logger.info("UserPersonaAgent: Creating realistic user persona for '%s'", idea)
         
         try:
             # Extract location information
@@ -25,11 +81,8 @@ class UserPersonaAgent(BaseAgent):
             city = location.get("city", "") if location else ""
             region = location.get("region", "") if location else ""
             
-            # Research target audience demographics
-            demographic_data = self._research_demographics(idea, country_code, city, region)
-            
-            # Research user behavior and pain points
-            behavior_data = self._research_user_behavior(idea, country_code)
+            # Research target audience demographics, user behavior and pain points
+            demographic_data, behavior_data = self._research_audience(idea, country_code, city, region)
             
             # Create validated persona using real data
             persona = self._create_validated_persona(
@@ -42,17 +95,20 @@ class UserPersonaAgent(BaseAgent):
             # Format results according to schema
             result = self._format_results(persona, scenario, demographic_data, behavior_data)
             
-            # Add pointwise summary
-            result["pointwise_summary"] = self.format_pointwise(result)
+            # _format_results already builds the persona summary; only fall back to
+            # the generic formatter if it produced none.
+            if not result.get("pointwise_summary"):
+                result["pointwise_summary"] = self.format_pointwise(result)
             
             return result
             
         except Exception as e:
             error_msg = f"User persona creation failed: {str(e)}"
-            print(f"   ❌ {error_msg}")
+            logger.error("%s", error_msg)
             # Return schema-compliant minimal persona result
             fp = self._create_fallback_persona(idea, 'US')
-            result = UserPersonaResult(
+            # Built from our own template, so skip re-validation.
+            result = UserPersonaResult.model_construct(
                 name=fp.get('name'),
                 age=fp.get('age', 30),
                 occupation=fp.get('occupation', 'Unknown'),
@@ -62,9 +118,13 @@ class UserPersonaAgent(BaseAgent):
             result["pointwise_summary"] = [error_msg]
             return result
     
-    def _research_demographics(self, idea: str, country_code: str, city: str, region: str) -> Dict[str, Any]:
-        """Research demographic data for the target audience."""
-        print(f"   Researching demographics in {city}, {region}, {country_code}")
+    def _research_audience(self, idea: str, country_code: str, city: str, region: str):
+        """Research demographics and user behaviour in one concurrent batch.
+
+        Returns `(demographic_data, behavior_data)`. Every result is visited once
+        (see `_extract_result`) and routed to the extractor for its query group.
+        """
+        logger.debug("Researching demographics in %s, %s, %s", city, region, country_code)
         
         demographic_data = {
             "age_data": [],
@@ -73,143 +133,148 @@ class UserPersonaAgent(BaseAgent):
             "tech_adoption_data": [],
             "citations": []
         }
+        behavior_data = {
+            "pain_points": [],
+            "behavior_patterns": [],
+            "motivations": [],
+            "citations": []
+        }
         
-        # Search queries for demographic information
-        queries = [
-            f"target audience demographics {idea} {country_code}",
-            f"average income {city} {region}",
-            f"tech adoption rates {country_code}",
-            f"occupation statistics {city} {region}",
-            f"age distribution {idea} users {country_code}"
-        ]
+        fields = {"idea": idea, "country_code": country_code, "city": city, "region": region}
+        queries = [t.format(**fields) for t in _DEMOGRAPHIC_QUERY_TEMPLATES + _BEHAVIOR_QUERY_TEMPLATES]
         
-        for query in queries:
+        # Searches run concurrently and each is extracted as soon as it lands, so
+        # the regex work overlaps with the searches still in flight.
+        demographic_count = len(_DEMOGRAPHIC_QUERY_TEMPLATES)
+        extracted = [[] for _ in queries]
+        for idx, results in iter_search_results(queries, max_results=3, country=country_code.lower()):
+            is_demographic = idx < demographic_count
             try:
-                results = enhanced_web_search(query, max_results=3, country=country_code.lower())
-                for result in results:
-                    # Extract and categorize demographic data
-                    self._extract_demographic_data(result, demographic_data, query)
-                    
-                    # Add to citations
-                    demographic_data["citations"].append({
-                        "query": query,
-                        "title": result.get("title", ""),
-                        "url": result.get("url", ""),
-                        "snippet": (result.get("snippet") or result.get("content", ""))[:200] + "..." if len((result.get("snippet") or result.get("content", ""))) > 200 else (result.get("snippet") or result.get("content", ""))
-                    })
-                
-                time.sleep(0.5)  # Rate limiting
+                extracted[idx] = [self._extract_result(result, is_demographic) for result in results]
             except Exception as e:
-                print(f"   Demographic search failed: {query} - {e}")
-                continue
+                label = "Demographic search" if is_demographic else "Behavior research"
+                logger.warning("%s failed: %s - %s", label, queries[idx], e)
         
-        return demographic_data
-    
-    def _extract_demographic_data(self, result: Dict, demographic_data: Dict, query: str):
-        """Extract and categorize demographic data from search results."""
-        snippet = (result.get("snippet") or result.get("content", "")).lower()
+        # Merge in query order so the output does not depend on completion order.
+        # Overlapping queries often return the same page, so each group counts a
+        # result (and cites it) only once.
+        seen = {True: set(), False: set()}
+        for idx, (query, items) in enumerate(zip(queries, extracted)):
+            is_demographic = idx < demographic_count
+            target = demographic_data if is_demographic else behavior_data
+            for key, citation, found in items:
+                if key in seen[is_demographic]:
+                    continue
+                seen[is_demographic].add(key)
+                for field, values in found.items():
+                    target[field].extend(values)
+                target["citations"].append({"query": query, **citation})
         
+        return demographic_data, behavior_data
+    
+    def _extract_result(self, result: Dict, is_demographic: bool):
+        """Runs one group's extractor on a result; returns (dedupe key, citation, extracted fields)."""
+        snippet = result.get("snippet") or result.get("content", "")
+        url = result.get("url")
+        if is_demographic:
+            found = {"age_data": [], "income_data": []}
+            self._extract_demographic_data(snippet, url, found)
+        else:
+            found = {"pain_points": [], "motivations": []}
+            self._extract_behavioral_insights(snippet, url, found)
+        citation = {
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "snippet": elide(snippet, 200)
+        }
+        return result_key(result), citation, found
+    
+    def _extract_demographic_data(self, snippet: str, source: str, demographic_data: Dict):
+        """Extract and categorize demographic data from a search result snippet."""
         # Age data
-        age_patterns = [
-            r'average age[^\d]*(\d+)',
-            r'aged[^\d]*(\d+)[^\d]*to[^\d]*(\d+)',
-            r'age group[^\d]*(\d+)[^\d]*-\s*(\d+)'
-        ]
-        
-        for pattern in age_patterns:
-            matches = re.findall(pattern, snippet)
+        for pattern in _AGE_PATTERNS:
+            matches = pattern.findall(snippet)
             for match in matches:
                 if len(match) == 1:
                     demographic_data["age_data"].append({
                         "value": int(match[0]),
                         "type": "average_age",
-                        "source": result.get("url")
+                        "source": source
                     })
                 elif len(match) == 2:
                     demographic_data["age_data"].append({
                         "range": [int(match[0]), int(match[1])],
                         "type": "age_range",
-                        "source": result.get("url")
+                        "source": source
                     })
         
         # Income data
-        income_patterns = [
-            r'average income[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            r'median income[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            r'salary[^\d]*\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-        ]
-        
-        for pattern in income_patterns:
-            matches = re.findall(pattern, snippet)
-            for match in matches:
+        for pattern in _INCOME_PATTERNS:
+            matches = pattern.findall(snippet)
+            for value, unit in matches:
                 try:
-                    income = float(match.replace(',', ''))
+                    income = float(value.replace(',', '')) * _MULT.get(unit.lower(), 1)
                     demographic_data["income_data"].append({
                         "amount": income,
                         "type": "average_income",
                         "currency": "USD",  # Will be converted later if needed
-                        "source": result.get("url")
+                        "source": source
                     })
                 except ValueError:
                     continue
     
-    def _research_user_behavior(self, idea: str, country_code: str) -> Dict[str, Any]:
-        """Research user behavior and pain points."""
-        behavior_data = {
-            "pain_points": [],
-            "behavior_patterns": [],
-            "motivations": [],
-            "citations": []
-        }
-        
-        queries = [
-            f"user pain points {idea}",
-            f"customer challenges {idea} {country_code}",
-            f"user behavior patterns {idea}",
-            f"what do users want from {idea}"
-        ]
-        
-        for query in queries:
-            try:
-                results = enhanced_web_search(query, max_results=3, country=country_code.lower())
-                for result in results:
-                    # Extract behavioral insights
-                    self._extract_behavioral_insights(result, behavior_data)
-                    
-                    behavior_data["citations"].append({
-                        "query": query,
-                        "title": result.get("title", ""),
-                        "url": result.get("url", ""),
-                        "snippet": (result.get("snippet") or result.get("content", ""))[:200] + "..." if len((result.get("snippet") or result.get("content", ""))) > 200 else (result.get("snippet") or result.get("content", ""))
-                    })
-                
-                time.sleep(0.5)
-            except Exception as e:
-                print(f"   Behavior research failed: {query} - {e}")
-                continue
-        
-        return behavior_data
-    
-    def _extract_behavioral_insights(self, result: Dict, behavior_data: Dict):
-        """Extract behavioral insights from search results."""
-        snippet = (result.get("snippet") or result.get("content", "")).lower()
-        
-        # Pain points
-        pain_keywords = ["frustrated", "difficult", "challenge", "problem", "issue", "pain point"]
-        if any(keyword in snippet for keyword in pain_keywords):
-            behavior_data["pain_points"].append({
-                "description": (result.get("snippet") or result.get("content", ""))[:150] + "..." if len((result.get("snippet") or result.get("content", ""))) > 150 else (result.get("snippet") or result.get("content", "")),
-                "source": result.get("url")
-            })
+    def _extract_behavioral_insights(self, snippet: str, source: str, behavior_data: Dict):
+        """Extract behavioral insights from a search result snippet."""
+        categories = set()
+        for match in _BEHAVIOR_ROUTER.finditer(snippet):
+            categories.add(match.lastindex)
+            if len(categories) == 2:
+                break
+        if not categories:
+            return
         
-        # Motivations
-        motivation_keywords = ["want", "need", "desire", "looking for", "goal"]
-        if any(keyword in snippet for keyword in motivation_keywords):
-            behavior_data["motivations"].append({
-                "description": (result.get("snippet") or result.get("content", ""))[:150] + "..." if len((result.get("snippet") or result.get("content", ""))) > 150 else (result.get("snippet") or result.get("content", "")),
-                "source": result.get("url")
-            })
+        entry = {"description": elide(snippet, 150), "source": source}
+        if _PAIN_POINT in categories:
+            behavior_data["pain_points"].append(dict(entry))
+        if _MOTIVATION in categories:
+            behavior_data["motivations"].append(dict(entry))
     
+    @staticmethod
+    def _summarize_figures(values: List[float]) -> Dict[str, float]:
+        """Count/min/median/max of extracted figures, or {} when there are none."""
+        if not values:
+            return {}
+        if np is not None:
+            arr = np.fromiter(values, dtype=np.float64, count=len(values))
+            return {"count": int(arr.size), "min": float(arr.min()),
+                    "median": float(np.median(arr)), "max": float(arr.max())}
+        return {"count": len(values), "min": float(min(values)),
+                "median": float(statistics.median(values)), "max": float(max(values))}
+
+    @staticmethod
+    def _compact_research(demographic_data: Dict, behavior_data: Dict) -> Dict[str, Any]:
+        """Value-level projection of the research data for the persona prompt.
+
+        Pain points and motivations are prefixes of the behaviour snippets, and
+        citation URLs/queries mean nothing to the model, so only the extracted
+        figures and each distinct snippet are sent, as compact JSON. Point
+        figures are reduced to summary statistics rather than listed one by one.
+        Ranges and snippets repeat across sources (syndicated articles, common
+        brackets), so each is sent once, in first-seen order.
+        """
+        age_data = demographic_data.get("age_data", [])
+        return {
+            "ages": UserPersonaAgent._summarize_figures([a["value"] for a in age_data if "value" in a]),
+            # Ranges are [low, high] lists, so dedupe on their tuple form.
+            "age_ranges": list({tuple(a["range"]): a["range"] for a in age_data if "range" in a}.values()),
+            "incomes": UserPersonaAgent._summarize_figures(
+                [i["amount"] for i in demographic_data.get("income_data", [])]),
+            "demographic_evidence": list(dict.fromkeys(
+                c["snippet"] for c in demographic_data.get("citations", []) if c.get("snippet"))),
+            "behavioral_evidence": list(dict.fromkeys(
+                c["snippet"] for c in behavior_data.get("citations", []) if c.get("snippet"))),
+        }
+
     def _create_validated_persona(self, idea: str, demographic_data: Dict, 
                                 behavior_data: Dict, country_code: str, city: str) -> Dict[str, Any]:
         """Create a validated user persona using real data."""
@@ -231,20 +296,14 @@ class UserPersonaAgent(BaseAgent):
         prompt = (
             "Create a realistic user persona for this startup idea: \"" + idea + "\"\n\n"
             "Location: " + (city or "") + ", " + (country_code or "") + "\n\n"
-            "Demographic Research Data:\n" + json.dumps(demographic_data, indent=2) + "\n\n"
-            "Behavioral Research Data:\n" + json.dumps(behavior_data, indent=2) + "\n\n"
+            "Research Data:\n" + json_utils.dumps(self._compact_research(demographic_data, behavior_data)) + "\n\n"
             "Create a detailed user persona with the following structure. Return ONLY valid JSON:\n" + schema_str
         )
         
         try:
-            response = generate_text(prompt)
-            cleaned = response.text.strip().replace('```json', '').replace('```', '').strip()
-            try:
-                persona_data = json.loads(cleaned)
-            except Exception:
-                fp = self._create_fallback_persona(idea, country_code)
-                # Ensure required fields exist
-                persona_data = fp
+            persona_data = generate_json(prompt)
+            if "error" in persona_data:
+                persona_data = self._create_fallback_persona(idea, country_code)
 
             # Add validation sources (safe)
             persona_data.setdefault("validation_sources", [])
@@ -257,14 +316,13 @@ class UserPersonaAgent(BaseAgent):
 
             return persona_data
         except Exception as e:
-            print(f"   Persona creation failed: {e}")
+            logger.warning("Persona creation failed: %s", e)
             return self._create_fallback_persona(idea, country_code)
     
     def _create_fallback_persona(self, idea: str, country_code: str) -> Dict[str, Any]:
         """Create a fallback persona when research data is limited."""
         # Base persona templates for different regions. Make them idea-aware (fitness vs generic business).
-        idea_lower = (idea or '').lower()
-        is_fitness = any(k in idea_lower for k in ['fitness', 'wellness', 'workout', 'diet', 'health', 'gym'])
+        is_fitness = bool(_FITNESS_IDEA_RE.search(idea or ''))
 
         # Base persona templates for different regions
         if country_code in ["US", "CA", "GB", "AU"]:
@@ -332,7 +390,7 @@ class UserPersonaAgent(BaseAgent):
         Create a realistic usage scenario for this user persona using the startup idea: "{idea}"
         
         Persona Details:
-        {json.dumps(persona, indent=2)}
+        {json_utils.dumps(persona)}
         
         Write a compelling short story (1-2 paragraphs) showing how this persona would discover,
         evaluate, and use the product in their daily life. Include specific pain points and how
@@ -345,7 +403,7 @@ class UserPersonaAgent(BaseAgent):
             response = generate_text(prompt)
             return response.text.strip()
         except Exception as e:
-            print(f"   Scenario creation failed: {e}")
+            logger.warning("Scenario creation failed: %s", e)
             return f"{persona.get('name', 'User')} discovers {idea} while searching for solutions to {persona.get('pain_points',[None])[0] if persona.get('pain_points') else 'a problem'}. After evaluating options, they decide to use it because it addresses their specific needs for {persona.get('goals',[None])[0] if persona.get('goals') else 'their goals'}."
     
     def _format_results(self, persona: Dict, scenario: str, 
@@ -356,25 +414,9 @@ class UserPersonaAgent(BaseAgent):
             primary_persona = UserPersonaDetail(**persona)
         except Exception as e:
             # Fallback to deterministic persona
-            print(f"   Persona validation failed, using fallback persona: {e}")
+            logger.warning("Persona validation failed, using fallback persona: %s", e)
             fallback = self._create_fallback_persona(scenario if isinstance(scenario, str) else 'Idea', persona.get('income_currency', 'US')) if isinstance(persona, dict) else self._create_fallback_persona('Idea', 'US')
-            primary_persona = UserPersonaDetail(**fallback)
-        
-        # Create demographic validation sources
-        demographic_validation = []
-        for citation in demographic_data.get("citations", [])[:5]:
-            demographic_validation.append({
-                "type": "demographic_research",
-                "source": citation.get("url"),
-                "description": citation.get("snippet")
-            })
-        
-        for citation in behavior_data.get("citations", [])[:3]:
-            demographic_validation.append({
-                "type": "behavioral_research",
-                "source": citation.get("url"),
-                "description": citation.get("snippet")
-            })
+            primary_persona = UserPersonaDetail.model_construct(**fallback)
         
         # Build a concise pointwise summary (useful for fallbacks too)
         summary_points = []
@@ -397,7 +439,9 @@ class UserPersonaAgent(BaseAgent):
         else:
             scenario_text = scenario
 
-        result_obj = UserPersonaResult(
+        # Every field comes from an already-validated UserPersonaDetail (or our own
+        # fallback template), so construct the result without validating it again.
+        result_obj = UserPersonaResult.model_construct(
             name=primary_persona.name,
             age=primary_persona.age,
             occupation=primary_persona.occupation,
@@ -406,12 +450,8 @@ class UserPersonaAgent(BaseAgent):
         ).model_dump()
 
         # Attach extra helpful fields for consumers (not part of strict UserPersonaResult schema but useful internally)
-        result_obj.setdefault('pointwise_summary', summary_points)
+        result_obj['pointwise_summary'] = summary_points or [f"{primary_persona.name}: {primary_persona.occupation}"]
         if validation_sources:
-            result_obj.setdefault('validation_sources', validation_sources)
-
-        # Ensure pointwise_summary is not empty
-        if not result_obj.get('pointwise_summary'):
-            result_obj['pointwise_summary'] = summary_points if summary_points else [f"{primary_persona.name}: {primary_persona.occupation}"]
+            result_obj['validation_sources'] = validation_sources
 
         return result_obj
\ No newline at end of file
@@ -1,7 +1,10 @@
+import logging
+
 from fastapi import APIRouter, HTTPException
 from models.schemas import IdeaInput, FullFeasibilityReport
 from coordinator.workflow import run_full_analysis, synthesize_final_report
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post(
@@ -36,5 +39,5 @@ async def validate_idea(idea_input: IdeaInput):
 
     except Exception as e:
         # A final catch-all for any unexpected errors in the workflow
-        print(f"A critical error occurred in the main endpoint: {e}")
+        logger.exception("A critical error occurred in the main endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred: {e}")
\ No newline at end of file
@@ -1,5 +1,5 @@
-import json
 import asyncio
+import logging
 from typing import Optional, Dict, Any
 
 # Import all of your advanced agent classes
@@ -10,8 +10,11 @@ from agents.technical_feasibility import TechnicalFeasibilityAgent
 from agents.finance import FinanceAgent
 from agents.risk import RiskAgent
 from agents.critic import CriticAgent
+from core import json_utils
 from core.clients import generate_text_with_fallback
 
+logger = logging.getLogger(__name__)
+
 async def _run_agent_async(agent_instance, timeout: int, **kwargs) -> Dict[str, Any]:
     """
     Runs an agent's run method asynchronously with a timeout.
@@ -24,52 +27,88 @@ async def _run_agent_async(agent_instance, timeout: int, **kwargs) -> Dict[str,
         )
         return result
     except asyncio.TimeoutError:
-        print(f"   ❌ {agent_name} timed out after {timeout}s")
+        logger.error("%s timed out after %ss", agent_name, timeout)
         return {"error": f"{agent_name} timed out."}
     except Exception as e:
-        print(f"   ❌ {agent_name} failed with an exception: {e}")
+        logger.error("%s failed with an exception: %s", agent_name, e)
         return {"error": f"{agent_name} failed: {str(e)}"}
 
+async def _prefetch_risk_evidence(risk_agent: RiskAgent, idea: str, location_data: Optional[dict],
+                                  timeout: int) -> Optional[str]:
+    """
+    Gathers RiskAgent's web evidence ahead of time. It depends only on the idea and
+    location, so it can overlap Market research. On failure or timeout returns None,
+    and RiskAgent joins the still-running searches instead of repeating them.
+    """
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(risk_agent.gather_evidence, idea, location_data),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Risk evidence prefetch timed out after %ss", timeout)
+    except Exception as e:
+        logger.warning("Risk evidence prefetch failed, RiskAgent will search itself: %s", e)
+    return None
+
 async def run_full_analysis(idea: str, location: Optional[dict] = None) -> dict:
     """
     Orchestrates the full, asynchronous multi-agent workflow.
     """
-    print("--- 🚀 Starting Full Analysis with Advanced Agents ---")
+    logger.info("Starting Full Analysis with Advanced Agents")
     
     # --- Phase 1: Run Location first to provide hyper-local context, then run Market, Tech, and Persona ---
-    print("--- Phase 1: Running Location analysis first to gather local context ---")
+    logger.info("Phase 1: Running Location analysis first to gather local context")
     if location:
-        location_data = await _run_agent_async(LocationAnalysisAgent(), timeout=30, idea=idea, location_text=location['text'])
+        location_data = await _run_agent_async(LocationAnalysisAgent(), timeout=30, idea=idea, location_text=location['text'], provided_location=location)
     else:
         location_data = None
 
-    print("--- Phase 1b: Running Market, Tech, and Persona analyses with available location context ---")
-    tasks_phase1b = [
-        _run_agent_async(MarketResearchAgent(), timeout=40, idea=idea, location_analysis=location_data),
-        _run_agent_async(TechnicalFeasibilityAgent(), timeout=30, idea=idea, location_analysis=location_data),
+    logger.info("Phase 1b: Running Market, Tech, and Persona analyses with available location context")
+    market_task = asyncio.create_task(
+        _run_agent_async(MarketResearchAgent(), timeout=40, idea=idea, location_analysis=location_data)
+    )
+    tech_task = asyncio.create_task(
+        _run_agent_async(TechnicalFeasibilityAgent(), timeout=30, idea=idea, location_analysis=location_data)
+    )
+    persona_task = asyncio.create_task(
         _run_agent_async(UserPersonaAgent(), timeout=25, idea=idea, location=location_data)
-    ]
-    market_data, tech_data, persona_data = await asyncio.gather(*tasks_phase1b)
-    
-    print("--- ✅ Phase 1 Complete ---")
+    )
+    risk_agent = RiskAgent()
+    risk_evidence_task = asyncio.create_task(
+        _prefetch_risk_evidence(risk_agent, idea, location_data, timeout=20)
+    )
 
-    # --- Phase 2: Run dependent agents sequentially with the necessary context ---
-    print("--- Phase 2: Running Finance and Risk analysis ---")
-    finance_data = await _run_agent_async(
-        FinanceAgent(), timeout=30, idea=idea, market_research_data=market_data, location_analysis=location_data
+    # --- Phase 2: Finance and Risk need only Market (and Location), so they start as soon as
+    # Market finishes, overlapping whatever is left of Tech and Persona. Risk's web evidence
+    # does not need Market at all and has been gathering alongside it ---
+    market_data = await market_task
+    logger.info("Phase 2: Running Finance and Risk analysis")
+    finance_task = asyncio.create_task(
+        _run_agent_async(
+            FinanceAgent(), timeout=30, idea=idea, market_research_data=market_data, location_analysis=location_data
+        )
     )
-    risk_data = await _run_agent_async(
-        RiskAgent(), timeout=30, idea=idea, market_research_data=market_data, location_analysis=location_data
+    risk_evidence = await risk_evidence_task
+    risk_task = asyncio.create_task(
+        _run_agent_async(
+            risk_agent, timeout=30, idea=idea, market_research_data=market_data, location_analysis=location_data,
+            risk_evidence=risk_evidence
+        )
     )
-    print("--- ✅ Phase 2 Complete ---")
+
+    tech_data, persona_data = await asyncio.gather(tech_task, persona_task)
+    logger.info("Phase 1 Complete")
+    finance_data, risk_data = await asyncio.gather(finance_task, risk_task)
+    logger.info("Phase 2 Complete")
 
     # --- Phase 3: Run the final critic with all available context ---
-    print("--- Phase 3: Running final critical assessment ---")
+    logger.info("Phase 3: Running final critical assessment")
     critique_data = await _run_agent_async(
         CriticAgent(), timeout=30, idea=idea, finance_data=finance_data, risk_data=risk_data, 
         tech_data=tech_data, market_data=market_data, location_data=location_data
     )
-    print("--- ✅ Phase 3 Complete ---")
+    logger.info("Phase 3 Complete")
 
     # --- Step 4: Compile all results into a single context object ---
     return {
@@ -87,14 +126,14 @@ def synthesize_final_report(analysis_context: dict) -> dict:
     """
     Synthesizes the final structured report from all advanced agent outputs.
     """
-    print("--- ✍️ Synthesizing Final Investment Memo ---")
+    logger.info("Synthesizing Final Investment Memo")
     prompt = f"""
     You are a Senior Partner at a top-tier Venture Capital firm. Your team of expert AI analysts has submitted their findings.
     Your task is to synthesize all their reports into a final, top-level investment memo in a structured JSON format.
 
     **Full Data Context from Your Analyst Team:**
     ---
-    {json.dumps(analysis_context, indent=2, default=str)[:14000]}
+    {json_utils.dumps(analysis_context)[:14000]}
     ---
 
     **Your Task:**
@@ -107,7 +146,7 @@ def synthesize_final_report(analysis_context: dict) -> dict:
         response = generate_text_with_fallback(prompt, is_json=True)
         # In a production app, you would validate this against the FullFeasibilityReport schema
         # For the hackathon, we'll directly parse and return it.
-        parsed = json.loads(response.text)
+        parsed = json_utils.loads(response.text)
         # If the LLM returned an error fallback, provide a conservative structured report
         if isinstance(parsed, dict) and parsed.get("error"):
             # Build deterministic fallback using available analysis pieces
@@ -129,5 +168,5 @@ def synthesize_final_report(analysis_context: dict) -> dict:
 
         return parsed
     except Exception as e:
-        print(f"   ❌ Final synthesis failed: {e}")
+        logger.error("Final synthesis failed: %s", e)
         return {"error": "Failed to generate the final investment memo."}
\ No newline at end of file
@@ -0,0 +1,240 @@
+# core/cache.py
+"""Small two-tier (in-memory LRU + SQLite) cache for expensive network lookups."""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_connections: Dict[str, sqlite3.Connection] = {}
+cache_db_lock = threading.Lock()
+
+
+def connect_cache_db(path: str) -> Optional[sqlite3.Connection]:
+    """Returns a shared connection for `path`, creating the table on first use.
+
+    Statements on the returned connection must run while holding `cache_db_lock`.
+    """
+    with cache_db_lock:
+        conn = _connections.get(path)
+        if conn is not None:
+            return conn
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            conn.commit()
+        except Exception as e:
+            logger.warning("Persistent cache unavailable at %s: %s", path, e)
+            return None
+        _connections[path] = conn
+        return conn
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU with per-entry TTL.
+
+    Values are stored as JSON text, so every `get` returns a fresh copy that the
+    caller may mutate without corrupting the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.get_raw(key)
+        return json.loads(raw) if raw is not None else None
+
+    def get_raw(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            raw = json.dumps(value, default=str)
+        except (TypeError, ValueError) as e:
+            logger.debug("Value for %s is not cacheable: %s", key, e)
+            return
+        ttl = self.ttl if ttl is None else ttl
+        self.set_raw(key, raw, time.time() + ttl if ttl else None)
+
+    def set_raw(self, key: str, raw: str, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (raw, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class PersistentCache:
+    """A namespaced key/value cache with per-entry TTL.
+
+    Lookups hit an in-process LRU first and fall back to a SQLite file shared by
+    every namespace. Values must be JSON-serializable; each `get` returns a fresh
+    copy, so callers are free to mutate what they receive. Any storage error
+    degrades to a cache miss rather than failing the caller.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None, maxsize: int = 1024,
+                 path: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path = path or os.path.join(settings.CACHE_DIR, "cache.sqlite3")
+        self._memory = MemoryCache(maxsize=maxsize)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.CACHE_ENABLED)
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        raw = self._memory.get_raw(key)
+        if raw is not None:
+            return json.loads(raw)
+
+        now = time.time()
+        conn = connect_cache_db(self.path)
+        if conn is None:
+            return None
+        try:
+            with cache_db_lock:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+        except Exception as e:
+            logger.debug("Cache read failed for %s/%s: %s", self.namespace, key, e)
+            return None
+        if row is None:
+            return None
+        raw, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            return None
+        self._memory.set_raw(key, raw, expires_at)
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        try:
+            raw = json.dumps(value, default=str)
+        except (TypeError, ValueError) as e:
+            logger.debug("Value for %s/%s is not cacheable: %s", self.namespace, key, e)
+            return
+        self._memory.set_raw(key, raw, expires_at)
+
+        conn = connect_cache_db(self.path)
+        if conn is None:
+            return
+        try:
+            with cache_db_lock:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, raw, expires_at),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.debug("Cache write failed for %s/%s: %s", self.namespace, key, e)
+
+
+def make_key(material: Any) -> str:
+    """Stable BLAKE2b digest of any JSON-serializable `material`, for use as a cache key."""
+    return hashlib.blake2b(
+        json.dumps(material, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+
+
+def cached(namespace: str, ttl: Optional[float] = None, key: Optional[Callable[..., Any]] = None,
+           should_cache: Callable[[Any], bool] = bool):
+    """Memoizes a function's JSON-serializable result in a `PersistentCache`.
+
+    Entries are keyed by a BLAKE2b digest of the call arguments, or of whatever
+    `key(*args, **kwargs)` returns when given (e.g. to add a model name). Results
+    for which `should_cache` is false (by default: falsy results) are not stored.
+    """
+    def decorator(func):
+        store = PersistentCache(namespace, ttl=ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            digest = make_key(key(*args, **kwargs) if key else [args, kwargs])
+            hit = store.get(digest)
+            if hit is not None:
+                return hit
+            value = func(*args, **kwargs)
+            if should_cache(value):
+                store.set(digest, value)
+            return value
+
+        wrapper.cache = store
+        return wrapper
+    return decorator
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result (or exception). Nothing is kept once
+    the call completes, so this complements a cache rather than replacing one:
+    it covers the window before the first result has been stored.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+__all__ = ["MemoryCache", "PersistentCache", "SingleFlight", "cached", "make_key", "connect_cache_db", "cache_db_lock"]
@@ -1,64 +1,204 @@
+import asyncio
+import contextlib
+import random
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import json
 import requests
-from typing import Optional, List, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict, Any, Callable, Hashable, Iterable, Iterator, Tuple, Type
+
+from .config import settings
+from .cache import PersistentCache, SingleFlight, cached, make_key
+from . import json_utils
+from .rate_limit import TokenBucket
+from .text import clean_content
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from pydantic import BaseModel
 
-# --- Library Imports with Graceful Fallbacks ---
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None
-try:
-    from tavily import TavilyClient
-except ImportError:
-    TavilyClient = None
 try:
-    import yfinance as yf
-except ImportError:
-    yf = None
+    import httpx
+except ImportError:  # concurrent searches then run the blocking client on worker threads
+    httpx = None
 
-from typing import Optional, List, Dict, Any
-import logging
-import json
-import requests
+logger = logging.getLogger(__name__)
 
-# Optional third-party libraries
-try:
-    import yfinance as yf
-except Exception:
-    yf = None
+# --- Provider clients (created only when both the SDK and an API key are present) ---
+# SDKs are imported only for configured providers: google.generativeai in
+# particular pulls in grpc/protobuf and dominates import time when unused.
+groq_client = None
+gemini_model = None
+tavily_client = None
+if settings.GROQ_API_KEY:
+    try:
+        from groq import Groq
+        groq_client = Groq(api_key=settings.GROQ_API_KEY)
+    except Exception as e:
+        logger.warning("Groq client unavailable: %s", e)
+if settings.GEMINI_API_KEY:
+    try:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    except Exception as e:
+        logger.warning("Gemini model unavailable: %s", e)
+if settings.TAVILY_API_KEY:
+    try:
+        from tavily import TavilyClient
+        tavily_client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+    except Exception as e:
+        logger.warning("Tavily client unavailable: %s", e)
 
-from .config import settings
-from tenacity import retry, stop_after_attempt, wait_exponential
+# Agents frequently issue the same query (and the same idea is often re-run), so
+# non-empty search results are kept for six hours, surviving process restarts.
+_search_cache = PersistentCache("web_search", ttl=6 * 3600, maxsize=512)
+_search_calls = SingleFlight()
 
-logger = logging.getLogger(__name__)
+# Shared by every agent thread so concurrent fan-out stays within the provider's limits.
+_search_limiter = TokenBucket(rate=settings.SEARCH_RATE_LIMIT)
+
+# One bucket per LLM provider, shared by every agent thread. Bursts of a few calls
+# (an analysis fans out to several agents at once) go straight through.
+_groq_limiter = TokenBucket(rate=settings.LLM_RATE_LIMIT_PER_MINUTE / 60, capacity=5)
+_gemini_limiter = TokenBucket(rate=settings.LLM_RATE_LIMIT_PER_MINUTE / 60, capacity=5)
+
+_MAX_RETRY_DELAY = 8.0
+_SERPAPI_URL = "https://serpapi.com/search"
+
+
+def _pooled_session(pool_size: int = 16) -> requests.Session:
+    """A requests.Session whose connection pool covers the search fan-out width.
+
+    Shared at module level so every search and lookup reuses keep-alive
+    TCP/TLS connections instead of handshaking per call. Retries stay with
+    tenacity, which knows which failures are transient.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_http = _pooled_session()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth retrying; other 4xx are not."""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    if httpx is not None:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            status = exc.response.status_code
+            return status == 429 or status >= 500
+    return False
+
+
+def _is_retryable_llm(exc: BaseException) -> bool:
+    """Rate limits (429), server errors and dropped connections from either LLM SDK.
+
+    Checked by attribute and class name so neither SDK has to be importable:
+    Groq errors carry `status_code`, google.api_core errors an integer `code`.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded"}
+
+
+def _jittered_backoff(retry_state) -> float:
+    """Capped exponential backoff (0.25s, 0.5s, 1s, ... up to 8s) scaled by 0.5-1.5x jitter."""
+    return min(_MAX_RETRY_DELAY, 0.25 * 2 ** (retry_state.attempt_number - 1)) * random.uniform(0.5, 1.5)
+
+
+@retry(stop=stop_after_attempt(3), wait=_jittered_backoff, retry=retry_if_exception(_is_retryable), reraise=True)
+def _serpapi_search(query: str, max_results: int, country: str, api_key: str) -> List[Dict[str, Any]]:
+    params = {"q": query, "api_key": api_key, "engine": "google", "num": max_results, "gl": country}
+    _search_limiter.acquire()
+    r = _http.get(_SERPAPI_URL, params=params, timeout=10)
+    # Follow the provider's advertised quota when it sends rate-limit headers.
+    _search_limiter.update_from_headers(r.headers)
+    r.raise_for_status()
+    return _parse_serpapi_results(r.content, max_results)
+
+
+@retry(stop=stop_after_attempt(3), wait=_jittered_backoff, retry=retry_if_exception(_is_retryable), reraise=True)
+async def _serpapi_search_async(client: "httpx.AsyncClient", query: str, max_results: int, country: str,
+                                api_key: str) -> List[Dict[str, Any]]:
+    """`_serpapi_search` on a pooled async client: same retries, same shared rate limiter."""
+    params = {"q": query, "api_key": api_key, "engine": "google", "num": max_results, "gl": country}
+    await _search_limiter.acquire_async()
+    r = await client.get(_SERPAPI_URL, params=params)
+    _search_limiter.update_from_headers(r.headers)
+    r.raise_for_status()
+    return _parse_serpapi_results(r.content, max_results)
+
+
+def _parse_serpapi_results(content: bytes, max_results: int) -> List[Dict[str, Any]]:
+    data = json_utils.loads(content)
+    return [
+        {
+            "title": item.get("title"),
+            "url": item.get("link") or item.get("url"),
+            "snippet": clean_content(item.get("snippet")),
+        }
+        for item in data.get("organic_results", [])[:max_results]
+    ]
+
+
+# Unicode word runs plus the symbols that change a query's meaning ("c++", "$5").
+_QUERY_TOKEN_RE = re.compile(r"\w+|[$%+#]")
+
+
+def canonical_query(query: str) -> str:
+    """Case-, spacing- and punctuation-insensitive form of a search query.
+
+    LLM-planned queries often repeat with different casing, spacing or quoting
+    ("AI fitness market size, 2024" vs "ai fitness  market size 2024"); these map
+    to one key. Word order is kept, since it can change what a query asks for.
+    """
+    return " ".join(_QUERY_TOKEN_RE.findall(query.casefold()))
+
+
+def _search_cache_key(query: str, max_results: int, country: str) -> str:
+    return f"{canonical_query(query)}|{max_results}|{country}"
 
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, max=5))
 def enhanced_web_search(query: str, max_results: int = 5, country: str = "us") -> List[Dict[str, Any]]:
     """Perform a tolerant web search using available backends.
 
-    Returns a list of dicts with keys: title, url, snippet/content.
+    Returns a list of dicts with keys: title, url, snippet/content. Transient
+    backend errors are retried with jittered backoff; anything else degrades to
+    an empty list.
     """
+    cache_key = _search_cache_key(query, max_results, country)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Agents searching at the same time often ask the same thing; one request serves them all.
+    return _search_calls.do(cache_key, lambda: _search_backends(query, max_results, country, cache_key))
+
+
+def _search_backends(query: str, max_results: int, country: str, cache_key: str) -> List[Dict[str, Any]]:
     # Try SerpAPI if key present
     serp_key = getattr(settings, "SERPAPI_API_KEY", None)
     if serp_key:
         try:
-            params = {"q": query, "api_key": serp_key, "engine": "google", "num": max_results, "gl": country}
-            r = requests.get("https://serpapi.com/search", params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            results = []
-            for item in data.get("organic_results", [])[:max_results]:
-                results.append({
-                    "title": item.get("title"),
-                    "url": item.get("link") or item.get("url"),
-                    "snippet": item.get("snippet") or item.get("snippet"),
-                })
+            results = _serpapi_search(query, max_results, country, serp_key)
+            if results:
+                _search_cache.set(cache_key, results)
             return results
         except Exception as e:
             logger.warning("SerpAPI search failed: %s", e)
@@ -68,11 +208,182 @@ def enhanced_web_search(query: str, max_results: int = 5, country: str = "us") -
     return []
 
 
+async def enhanced_web_search_async(query: str, max_results: int = 5, country: str = "us",
+                                    client: Optional["httpx.AsyncClient"] = None) -> List[Dict[str, Any]]:
+    """Async variant of `enhanced_web_search`.
+
+    With an httpx `client` (see `_async_search_client`) the SerpAPI request is made
+    natively on the event loop; otherwise the blocking call runs in a worker thread.
+    """
+    serp_key = getattr(settings, "SERPAPI_API_KEY", None)
+    if client is None or not serp_key:
+        return await asyncio.to_thread(enhanced_web_search, query, max_results, country)
+
+    cache_key = _search_cache_key(query, max_results, country)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        results = await _serpapi_search_async(client, query, max_results, country, serp_key)
+    except Exception as e:
+        logger.warning("SerpAPI search failed: %s", e)
+        return []
+    if results:
+        _search_cache.set(cache_key, results)
+    return results
+
+
+def _async_search_client() -> contextlib.AbstractAsyncContextManager:
+    """A pooled httpx client for one fan-out, or a null context when httpx or SerpAPI is unavailable.
+
+    The client is scoped to the fan-out because agents each run their own event
+    loop, and an httpx client cannot move between loops.
+    """
+    if httpx is None or not getattr(settings, "SERPAPI_API_KEY", None):
+        return contextlib.nullcontext(None)
+    return httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=10))
+
+
+async def gather_web_searches(queries: List[str], max_results: int = 5, country: str = "us",
+                              concurrency: int = 5) -> List[List[Dict[str, Any]]]:
+    """Run several web searches concurrently, at most `concurrency` in flight at once.
+
+    Returns one result list per query, in the same order as `queries`. A failed
+    search yields an empty list so one bad query never sinks the whole batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Queries that differ only in wording order or stopwords are searched once
+    unique: Dict[str, str] = {}
+    for query in queries:
+        unique.setdefault(canonical_query(query), query)
+
+    async with _async_search_client() as client:
+        async def _bounded(query: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await enhanced_web_search_async(query, max_results=max_results, country=country, client=client)
+
+        results = await asyncio.gather(*(_bounded(q) for q in unique.values()), return_exceptions=True)
+    by_key = dict(zip(unique, results))
+    out: List[List[Dict[str, Any]]] = []
+    for query in queries:
+        res = by_key[canonical_query(query)]
+        if isinstance(res, Exception):
+            logger.warning("Concurrent web search failed for %s: %s", query, res)
+            out.append([])
+        else:
+            out.append(list(res or []))
+    return out
+
+
+@lru_cache(maxsize=4096)
+def canonical_url(url: str) -> str:
+    """Reduces a URL to host + path + query so trivial variants compare equal.
+
+    Scheme, a leading "www.", the fragment, a trailing slash and `utm_*` tracking
+    parameters are dropped. Overlapping searches return the same URLs over and over,
+    so parses are memoized.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    key = host + parts.path.rstrip("/")
+    query = "&".join(p for p in parts.query.split("&") if p and not p.lower().startswith("utm_"))
+    return f"{key}?{query}" if query else key
+
+
+def result_key(result: Dict[str, Any]) -> Hashable:
+    """Identity of a search result: its canonical URL, or its (title, snippet) prefixes when it has none.
+
+    Plain strings and tuples hash natively, so no digest needs to be computed. Only
+    the first 128 snippet characters count: page content can run to kilobytes, and
+    copies of one result differ, if at all, in how much of the tail was captured.
+    """
+    url = result.get("url")
+    if url:
+        return canonical_url(url)
+    return ((result.get("title") or "")[:64], (result.get("snippet") or result.get("content") or "")[:128])
+
+
+def dedupe_results(results: Iterable[Dict[str, Any]], limit: Optional[int] = None,
+                   score: Optional[Callable[[Dict[str, Any]], float]] = None) -> List[Dict[str, Any]]:
+    """Drops repeated search results, keeping the first occurrence of each.
+
+    With `score`, results are visited best-first so the copy kept is always the
+    highest scored one. With `limit`, iteration stops as soon as that many unique
+    results are collected, so a lazy iterable is only consumed as far as needed.
+    """
+    if score is not None:
+        results = sorted(results, key=score, reverse=True)
+    seen = set()
+    unique = []
+    for result in results:
+        key = result_key(result)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(result)
+        if limit is not None and len(unique) >= limit:
+            break
+    return unique
+
+
+def iter_search_results(queries: List[str], max_results: int = 5, country: str = "us",
+                        max_workers: int = 5) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """Runs searches on a thread pool and yields `(index, results)` as each one finishes.
+
+    Lets callers process early results while slower searches are still in
+    flight, and stop early by closing the generator. A failed search yields an empty list. The shared rate limiter inside
+    `enhanced_web_search` still applies across all workers.
+    """
+    def _search(query: str) -> List[Dict[str, Any]]:
+        try:
+            return enhanced_web_search(query, max_results=max_results, country=country) or []
+        except Exception as e:
+            logger.warning("Web search failed for %s: %s", query, e)
+            return []
+
+    if not queries:
+        return
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(queries)), thread_name_prefix="web-search")
+    try:
+        futures = {pool.submit(_search, query): idx for idx, query in enumerate(queries)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # A caller that stops early (closing the generator) cancels the searches not yet
+        # started; ones already running finish in the background rather than blocking it.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def search_many(queries: List[str], max_results: int = 5, country: str = "us",
+                max_workers: int = 5) -> List[List[Dict[str, Any]]]:
+    """Thread-pool counterpart of `gather_web_searches` for synchronous callers.
+
+    Returns one result list per query, in the same order as `queries`; a failed
+    search yields an empty list.
+    """
+    ordered: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    for idx, results in iter_search_results(queries, max_results, country, max_workers):
+        ordered[idx] = results
+    return ordered
+
+
+def _load_yfinance():
+    """Imports yfinance on first use (it loads pandas, which is slow); None if not installed."""
+    try:
+        import yfinance
+    except ImportError:
+        return None
+    return yfinance
+
+
 def get_proxy_company_financials(ticker: str) -> Optional[Dict[str, Any]]:
     """Fetch key financial metrics for a public company using yfinance when available.
 
     Returns None when data is unavailable.
     """
+    yf = _load_yfinance()
     if not yf:
         logger.info("yfinance not available; cannot fetch financials for %s", ticker)
         return None
@@ -124,8 +435,72 @@ class SimpleResponse:
         self.text = text
 
 
-def generate_text_with_fallback(prompt: str, is_json: bool = False) -> SimpleResponse:
-    """LLM compatibility wrapper. Returns a deterministic fallback indicating no model available."""
+@retry(stop=stop_after_attempt(3), wait=_jittered_backoff, retry=retry_if_exception(_is_retryable_llm), reraise=True)
+def _groq_generate(prompt: str, is_json: bool, system: Optional[str] = None, fast: bool = False) -> str:
+    # JSON mode makes Groq constrain decoding to a single JSON object (no fences).
+    extra = {"response_format": {"type": "json_object"}} if is_json else {}
+    # A byte-identical system message leads every request, so the provider's
+    # prefix cache can reuse it across calls.
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    model = settings.GROQ_FAST_MODEL if fast else settings.GROQ_MODEL
+    _groq_limiter.acquire()
+    completion = groq_client.chat.completions.create(model=model, messages=messages, **extra)
+    return completion.choices[0].message.content or ""
+
+
+@retry(stop=stop_after_attempt(3), wait=_jittered_backoff, retry=retry_if_exception(_is_retryable_llm), reraise=True)
+def _gemini_generate(prompt: str, is_json: bool, system: Optional[str] = None, fast: bool = False) -> str:
+    # gemini-1.5-flash is already the low-latency tier, so `fast` needs no model switch.
+    config = {"response_mime_type": "application/json"} if is_json else None
+    contents = f"{system}\n\n{prompt}" if system else prompt
+    _gemini_limiter.acquire()
+    return gemini_model.generate_content(contents, generation_config=config).text
+
+
+_llm_calls = SingleFlight()
+
+
+# Identical prompts (re-runs of the same idea, demo loops) reuse the previous
+# completion for a day instead of paying for another provider round-trip.
+@cached("llm_response", ttl=24 * 3600,
+        key=lambda prompt, is_json, system=None, fast=False: [
+            prompt, is_json, system, settings.GROQ_FAST_MODEL if fast else settings.GROQ_MODEL, settings.GEMINI_MODEL])
+def _generate_with_providers(prompt: str, is_json: bool, system: Optional[str] = None,
+                             fast: bool = False) -> Optional[str]:
+    """Returns the first successful completion from Groq, then Gemini, or None."""
+    providers = (("Groq", groq_client, _groq_generate), ("Gemini", gemini_model, _gemini_generate))
+    for name, client, call in providers:
+        if client is None:
+            continue
+        try:
+            text = call(prompt, is_json, system, fast)
+            if text:
+                return text
+        except Exception as e:
+            logger.warning("%s generation failed: %s", name, e)
+    return None
+
+
+def generate_text_with_fallback(prompt: str, is_json: bool = False, system: Optional[str] = None,
+                                fast: bool = False) -> SimpleResponse:
+    """LLM compatibility wrapper.
+
+    Tries each configured provider in turn (Groq, then Gemini). With `is_json`
+    the providers are asked for a JSON object natively. Static instructions
+    belong in `system`: it is sent ahead of `prompt` unchanged, so providers
+    with prefix caching reuse it. `fast` selects the smaller GROQ_FAST_MODEL for
+    short, structured outputs where latency matters more than depth. When no
+    provider is configured, or all of them fail, returns a deterministic fallback.
+    """
+    if groq_client is not None or gemini_model is not None:
+        # Concurrent agents (e.g. a run_batch over similar ideas) often send the same
+        # prompt at once; only one provider call is made and every caller shares it.
+        text = _llm_calls.do(make_key([prompt, is_json, system, fast]),
+                             lambda: _generate_with_providers(prompt, is_json, system, fast))
+        if text:
+            return SimpleResponse(text)
+
     if is_json:
         return SimpleResponse(json.dumps({"error": "LLM unavailable", "detail": "No model configured in this environment"}))
     return SimpleResponse("LLM unavailable: no model configured in this environment.")
@@ -136,6 +511,25 @@ def generate_text(prompt: str, is_json: bool = False) -> SimpleResponse:
     return generate_text_with_fallback(prompt, is_json=is_json)
 
 
+def generate_json(prompt: str, schema: Optional[Type[BaseModel]] = None) -> Dict[str, Any]:
+    """Requests a JSON object from the LLM and returns it parsed.
+
+    Providers run in JSON mode, so no markdown-fence stripping is needed. When
+    `schema` is given, its JSON schema is appended to the prompt. Failures come
+    back as `{"error": ...}`, the convention the agents already check for.
+    """
+    if schema is not None:
+        prompt = f"{prompt}\n\nThe JSON object must conform to this JSON schema:\n{json_utils.dumps(schema.model_json_schema())}"
+    response = generate_text_with_fallback(prompt, is_json=True)
+    try:
+        parsed = json_utils.loads(response.text)
+    except ValueError as e:
+        return {"error": f"LLM returned invalid JSON: {e}"}
+    if not isinstance(parsed, dict):
+        return {"error": "LLM returned a JSON value that is not an object"}
+    return parsed
+
+
 @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, max=5))
 def get_location_data(query: str) -> Optional[Dict[str, Any]]:
     """Thin wrapper to fetch location data from OpenWeather or OpenRoutes if configured; otherwise return None."""
@@ -143,9 +537,9 @@ def get_location_data(query: str) -> Optional[Dict[str, Any]]:
         if getattr(settings, 'OPENROUTING_API_KEY', None):
             try:
                 url = f"https://api.openrouteservice.org/geocode/search?api_key={settings.OPENROUTING_API_KEY}&text={query}"
-                r = requests.get(url, timeout=10)
+                r = _http.get(url, timeout=10)
                 r.raise_for_status()
-                data = r.json()
+                data = json_utils.loads(r.content)
                 if data and data.get('features'):
                     props = data['features'][0].get('properties', {})
                     geom = data['features'][0].get('geometry', {})
@@ -165,9 +559,9 @@ def get_location_data(query: str) -> Optional[Dict[str, Any]]:
         if getattr(settings, 'OPENWEATHER_API_KEY', None):
             try:
                 url = f"http://api.openweathermap.org/data/2.5/weather?q={query}&appid={settings.OPENWEATHER_API_KEY}"
-                r = requests.get(url, timeout=10)
+                r = _http.get(url, timeout=10)
                 r.raise_for_status()
-                data = r.json()
+                data = json_utils.loads(r.content)
                 return {
                     'name': data.get('name'),
                     'country': data.get('sys', {}).get('country'),
@@ -24,6 +24,12 @@ class Settings(BaseSettings):
     SERPAPI_API_KEY: Optional[str] = None
     OPENROUTING_API_KEY: Optional[str] = None
     OPENWEATHER_API_KEY: Optional[str] = None
+
+    # LLM models used when the corresponding API key is configured
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    # Smaller, lower-latency Groq model for short structured calls (e.g. search query planning)
+    GROQ_FAST_MODEL: str = "llama-3.1-8b-instant"
+    GEMINI_MODEL: str = "gemini-1.5-flash"
     
     # Financial data APIs
     ALPHA_VANTAGE_API_KEY: Optional[str] = None
@@ -34,10 +40,21 @@ class Settings(BaseSettings):
     FASTAPI_HOST: str = "0.0.0.0"
     FASTAPI_PORT: int = 8000
     DEBUG: bool = False
+    # Level for the application's own loggers (agents, coordinator, clients)
+    LOG_LEVEL: str = "INFO"
     
     # Optional comma-separated list of allowed CORS origins
     ALLOWED_ORIGINS: Optional[str] = None
 
+    # Local response cache (geocoding, search results). Set CACHE_ENABLED=False to bypass it.
+    CACHE_DIR: str = ".cache"
+    CACHE_ENABLED: bool = True
+
+    # Outbound web-search requests per second (bursts up to this many are allowed).
+    SEARCH_RATE_LIMIT: float = 5.0
+    # LLM requests per minute, per provider (Groq's free tier allows about 30).
+    LLM_RATE_LIMIT_PER_MINUTE: float = 25.0
+
 
 # Single settings instance for app-wide use
 settings = Settings()
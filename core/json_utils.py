@@ -0,0 +1,102 @@
+# core/json_utils.py
+"""JSON helpers that use orjson when it is installed and the stdlib otherwise."""
+
+import json
+import re
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The only characters that can change ObjectScanner's state; everything between
+# them is skipped by the regex engine instead of the Python loop.
+_STRUCTURAL_CHARS = re.compile(r'[{}"\\]')
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parses JSON from text or raw bytes (e.g. `response.content`)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serializes `obj` to compact JSON text, stringifying unknown types."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str, separators=(",", ":"))
+
+
+class ObjectScanner:
+    """Incrementally finds where the first top-level `{...}` object ends.
+
+    Text is fed in chunks (e.g. a streamed reply); brace depth is tracked
+    left to right, ignoring braces inside strings, so each character is
+    looked at once. Text before the first `{` is skipped.
+    """
+
+    __slots__ = ("depth", "in_string", "escaped")
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> int:
+        """Returns the index in `chunk` just past the closing brace, or -1 if the object is still open."""
+        pos = 0
+        if self.escaped:
+            if not chunk:
+                return -1
+            # The previous chunk ended on a backslash inside a string
+            self.escaped = False
+            pos = 1
+        escaped_at = -1
+        for match in _STRUCTURAL_CHARS.finditer(chunk, pos):
+            i = match.start()
+            if i == escaped_at:
+                continue
+            ch = chunk[i]
+            if self.in_string:
+                if ch == "\\":
+                    escaped_at = i + 1
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == "{":
+                self.depth += 1
+            elif self.depth == 0:
+                continue
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        self.escaped = escaped_at == len(chunk)
+        return -1
+
+
+def extract_object(text: str) -> Any:
+    """Parses the first balanced `{...}` object in `text`.
+
+    For model replies that wrap the JSON in a code fence or prose. The scan is
+    linear with no regex backtracking involved. Raises ValueError when no
+    complete object is found. Clean replies, the norm under JSON mode, parse
+    directly without the scan.
+    """
+    try:
+        return loads(text)
+    except ValueError:
+        pass
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object found")
+    end = ObjectScanner().feed(text[start:])
+    if end < 0:
+        raise ValueError("unterminated JSON object")
+    return loads(text[start:start + end])
+
+
+__all__ = ["ObjectScanner", "loads", "dumps", "extract_object"]
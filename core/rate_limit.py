@@ -0,0 +1,74 @@
+# core/rate_limit.py
+"""Token-bucket limiter for outbound API calls."""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Allows bursts of up to `capacity` calls and refills at `rate` tokens per
+    second. `acquire` returns immediately while tokens are available and only
+    sleeps for the minimum time needed once the bucket is empty.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Takes `tokens` from the bucket and returns how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """Changes the refill rate, e.g. from a provider's advertised remaining quota."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = float(rate)
+
+    def update_from_headers(self, headers, floor: float = 0.1) -> Optional[float]:
+        """Derives the rate from `X-RateLimit-Remaining` / `X-RateLimit-Reset` headers.
+
+        The rate becomes remaining calls divided by seconds until the window
+        resets, but never exceeds the configured capacity (burst size) or drops
+        below `floor`. Returns the new rate, or None when the headers are
+        missing or malformed, in which case the rate is left unchanged.
+        """
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        rate = max(floor, min(self.capacity, remaining / reset if reset > 0 else self.capacity))
+        self.set_rate(rate)
+        return rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocks until `tokens` are available; returns the number of seconds waited."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """`acquire` for coroutines: waits without blocking the event loop."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+__all__ = ["TokenBucket"]
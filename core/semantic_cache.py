@@ -0,0 +1,142 @@
+# core/semantic_cache.py
+"""Similarity-keyed cache so rephrased ideas can reuse a recent analysis."""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, List, Optional
+
+from .cache import cache_db_lock, connect_cache_db
+from .config import settings
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+_HASH_DIM = 512
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _hashed_embedding(text: str) -> List[float]:
+    """Dependency-free fallback: an L2-normalized hashed vector of words and word bigrams.
+
+    Bigrams keep the texts' word order in play, so ideas that swap roles ("dog owners
+    with cat sitters" vs "cat owners with dog sitters") do not look identical.
+    """
+    vec = [0.0] * _HASH_DIM
+    tokens = _TOKEN_RE.findall(text.lower())
+    for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        vec[zlib.crc32(feature.encode()) % _HASH_DIM] += 1.0
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec] if norm else vec
+
+
+def _embedding_backend() -> str:
+    return "minilm" if SentenceTransformer else "hashed-bigram"
+
+
+def embed(text: str) -> List[float]:
+    """Embeds `text` with a local MiniLM model when available, else hashed words and bigrams."""
+    global _model
+    if SentenceTransformer is None:
+        return _hashed_embedding(text)
+    with _model_lock:
+        if _model is None:
+            _model = SentenceTransformer("all-MiniLM-L6-v2")
+    return [float(v) for v in _model.encode(text, normalize_embeddings=True)]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    # Both vectors are unit-length, so the dot product is the cosine similarity.
+    return sum(x * y for x, y in zip(a, b))
+
+
+class SemanticCache:
+    """Returns stored values for texts whose embedding is close to a previous one.
+
+    Entries are grouped by `namespace` plus an exact `scope` string (for example a
+    normalized location), so only the free-form part of the input is compared
+    semantically. Entries older than `ttl` seconds are ignored.
+    """
+
+    def __init__(self, namespace: str, threshold: float = 0.93, ttl: float = 6 * 3600,
+                 path: Optional[str] = None):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl = ttl
+        self.path = path or os.path.join(settings.CACHE_DIR, "cache.sqlite3")
+
+    def _conn(self):
+        if not settings.CACHE_ENABLED:
+            return None
+        conn = connect_cache_db(self.path)
+        if conn is None:
+            return None
+        with cache_db_lock:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                " namespace TEXT NOT NULL, scope TEXT NOT NULL, backend TEXT NOT NULL,"
+                " embedding TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+        return conn
+
+    def get(self, text: str, scope: str = "") -> Optional[Any]:
+        try:
+            conn = self._conn()
+            if conn is None:
+                return None
+            with cache_db_lock:
+                rows = conn.execute(
+                    "SELECT embedding, value FROM semantic_cache"
+                    " WHERE namespace = ? AND scope = ? AND backend = ? AND created_at > ?",
+                    (self.namespace, scope, _embedding_backend(), time.time() - self.ttl),
+                ).fetchall()
+            if not rows:
+                return None
+            query = embed(text)
+            best_score, best_value = 0.0, None
+            for raw_emb, raw_value in rows:
+                score = _cosine(query, json.loads(raw_emb))
+                if score > best_score:
+                    best_score, best_value = score, raw_value
+            if best_value is not None and best_score >= self.threshold:
+                logger.debug("Semantic cache hit in %s (similarity %.3f)", self.namespace, best_score)
+                return json.loads(best_value)
+        except Exception as e:
+            logger.debug("Semantic cache lookup failed in %s: %s", self.namespace, e)
+        return None
+
+    def set(self, text: str, value: Any, scope: str = "") -> None:
+        try:
+            conn = self._conn()
+            if conn is None:
+                return
+            raw_value = json.dumps(value, default=str)
+            raw_emb = json.dumps(embed(text))
+            with cache_db_lock:
+                conn.execute(
+                    "DELETE FROM semantic_cache WHERE namespace = ? AND created_at <= ?",
+                    (self.namespace, time.time() - self.ttl),
+                )
+                conn.execute(
+                    "INSERT INTO semantic_cache (namespace, scope, backend, embedding, value, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, scope, _embedding_backend(), raw_emb, raw_value, time.time()),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.debug("Semantic cache write failed in %s: %s", self.namespace, e)
+
+
+__all__ = ["SemanticCache", "embed"]
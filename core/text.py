@@ -0,0 +1,95 @@
+# core/text.py
+"""Shared helpers for cleaning text pulled from web search results."""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import json_utils
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+_WS_RE = re.compile(r"\s+")
+# Rough characters per token for English prose, used when tiktoken is unavailable.
+_CHARS_PER_TOKEN = 4
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapses every run of whitespace to a single space and trims the ends."""
+    return _WS_RE.sub(" ", text).strip()
+
+
+def elide(text: Optional[str], n: int = 200) -> str:
+    """Caps `text` at `n` characters plus an ellipsis, returning short text unchanged."""
+    if not text:
+        return ""
+    return text if len(text) <= n else f"{text[:n]}..."
+
+
+def clean_content(content: Optional[str], limit: int = 1000) -> str:
+    """Normalizes whitespace in a snippet and caps it at `limit` characters."""
+    if not content:
+        return ""
+    return elide(normalize_whitespace(content), limit)
+
+
+def compact_evidence(results: Iterable[Dict[str, Any]], char_budget: int = 12000,
+                     snippet_chars: int = 400) -> str:
+    """Renders search results as one `[title] snippet` line each, stopping at `char_budget`.
+
+    Much denser per prompt token than dumping the raw result dicts, and the budget
+    is spent on whole lines instead of cutting the last one mid-way.
+    """
+    lines: List[str] = []
+    used = 0
+    for r in results:
+        snippet = r.get("snippet") or r.get("content") or ""
+        line = f"[{r.get('title', '')}] {elide(snippet, snippet_chars)}"
+        used += len(line) + 1
+        if used > char_budget:
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """The cl100k_base encoding, or None when tiktoken (or its encoding file) is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens in `text`: exact under cl100k_base when tiktoken is installed, else estimated."""
+    encoding = _token_encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def pack_json(items: Iterable[Any], token_budget: int) -> str:
+    """Serializes `items` as a compact JSON array that fits in `token_budget` tokens.
+
+    Whole items are kept in order until the next one would overflow the budget,
+    so the result is always valid JSON, unlike slicing a serialized string.
+    """
+    parts: List[str] = []
+    used = 2  # the enclosing brackets
+    for item in items:
+        encoded = json_utils.dumps(item)
+        cost = count_tokens(encoded) + 1
+        if used + cost > token_budget:
+            break
+        parts.append(encoded)
+        used += cost
+    return "[" + ",".join(parts) + "]"
+
+
+__all__ = ["clean_content", "compact_evidence", "count_tokens", "elide", "normalize_whitespace", "pack_json"]
@@ -1,9 +1,12 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from api.v1 import tasks
+from core.config import settings
 import os
 import logging
 
+# Agent progress goes through the standard logging tree; LOG_LEVEL=DEBUG shows per-step detail.
+logging.basicConfig(level=settings.LOG_LEVEL.upper(), format="%(levelname)s:%(name)s: %(message)s")
 logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI(
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing import List, Dict, Optional, Any, Literal
+# pydantic can only validate typing_extensions.TypedDict on Python < 3.12
+from typing_extensions import TypedDict
 from datetime import datetime
 
 # --- API Input Schemas ---
@@ -35,6 +37,18 @@ class MarketResearchResult(BaseModel):
     market_trends: List[str]
     sources: List[HttpUrl]
 
+class MarketResearchResultDict(TypedDict):
+    """Plain-dict shape of `MarketResearchResult`, identical to its `model_dump()`.
+
+    Validating straight into this shape with a `TypeAdapter` skips building (and
+    then dumping) a model instance.
+    """
+    market_size: str
+    competitors: List[Dict[str, Any]]
+    target_audience: str
+    market_trends: List[str]
+    sources: List[HttpUrl]
+
 class UserPersonaResult(BaseModel):
     name: str
     age: int
@@ -115,8 +129,8 @@ class FullFeasibilityReport(BaseModel):
     metadata: Dict[str, Any]
     generated_at: Optional[datetime] = None
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "title": "Startup Feasibility Report: AI Personal Trainer",
                 "executive_summary": "Localized analysis for Pune indicates ...",
@@ -124,4 +138,5 @@ class FullFeasibilityReport(BaseModel):
                 "metadata": {"version": "2.0"},
                 "generated_at": "2025-08-25T12:00:00Z"
             }
-        }
\ No newline at end of file
+        }
+    )
@@ -32,3 +32,243 @@ def test_risk_agent_fallback():
     validated = RiskResult.model_validate(result)
     assert isinstance(validated, RiskResult)
     assert validated.overall_risk_score >= 0
+
+
+def test_risk_agent_uses_prefetched_evidence(monkeypatch):
+    from core.config import settings
+    monkeypatch.setattr(settings, 'CACHE_ENABLED', False)
+    agent = RiskAgent()
+    seen = []
+    monkeypatch.setattr(agent, 'gather_evidence', lambda *_: (_ for _ in ()).throw(AssertionError('searched')))
+    monkeypatch.setattr(agent, '_synthesize_risk_analysis', lambda **kw: seen.append(kw['risk_evidence']) or {'error': 'offline'})
+    result = agent.run('AI fitness coach', {}, None, risk_evidence='prefetched')
+    assert seen == ['prefetched']
+    assert RiskResult.model_validate(result).risk_level == 'medium'
+
+
+def test_risk_evidence_joins_gathering_already_in_flight(monkeypatch):
+    import threading
+    import time
+    from agents import risk
+    from core.config import settings
+    monkeypatch.setattr(settings, 'CACHE_ENABLED', False)
+    calls = []
+
+    def slow_search_many(queries, max_results=2, country='us'):
+        calls.append(queries)
+        time.sleep(0.2)
+        return [[{'url': f'https://example.com/{i}'}] for i in range(len(queries))]
+
+    monkeypatch.setattr(risk, 'search_many', slow_search_many)
+    agent = RiskAgent()
+    location = {'country_code': 'in'}
+    prefetch = threading.Thread(target=agent.gather_evidence, args=('AI fitness coach', location))
+    prefetch.start()
+    time.sleep(0.05)
+    evidence = agent.gather_evidence('AI fitness coach', location)
+    prefetch.join()
+    assert len(calls) == 1
+    assert "regulatory challenges for 'AI fitness coach' in IN" in evidence
+
+def test_risk_evidence_is_packed_into_whole_results_and_blocks(monkeypatch):
+    import json
+    from agents import risk
+    from core.config import settings
+    from core.text import count_tokens
+    monkeypatch.setattr(settings, 'CACHE_ENABLED', False)
+    page = {'title': 'Why fitness apps fail', 'snippet': 'churn ' * 250}
+    monkeypatch.setattr(risk, 'search_many', lambda queries, **kw: [[dict(page, url=f'https://e.com/{i}'), page]
+                                                                     for i in range(len(queries))])
+    evidence = RiskAgent().gather_evidence('AI fitness coach', {'country_code': 'in'})
+    blocks = evidence.split('\n\n')
+    assert len(blocks) == 3
+    for block in blocks:
+        _, packed = block.split(':\n', 1)
+        assert len(json.loads(packed)) == 1
+        assert count_tokens(packed) <= risk._EVIDENCE_TOKENS_PER_QUERY
+
+    # Past the section budget whole query blocks are dropped, never cut
+    monkeypatch.setattr(risk, '_EVIDENCE_TOKENS', count_tokens(evidence) - 1)
+    trimmed = RiskAgent().gather_evidence('AI fitness coach', {'country_code': 'in'})
+    assert trimmed == '\n\n'.join(blocks[:2])
+
+def test_location_uses_provided_location_and_prefetched_intelligence(monkeypatch):
+    from agents.location_analysis import LocationAnalysisAgent
+    from core.config import settings
+    monkeypatch.setattr(settings, 'CACHE_ENABLED', False)
+    agent = LocationAnalysisAgent()
+    monkeypatch.setattr(agent, '_geocode_location', lambda *_: (_ for _ in ()).throw(AssertionError('geocoded')))
+    monkeypatch.setattr(agent, '_gather_intelligence', lambda *_: (_ for _ in ()).throw(AssertionError('searched')))
+    provided = {
+        'latitude': 18.52, 'longitude': 73.85, 'country_code': 'in', 'city': 'Pune',
+        'prefetched_intelligence': {'web_evidence': {'competitors': [{'url': 'https://example.com', 'title': 'Pune Fitness Studio'}]}},
+    }
+    result = agent.run('AI fitness coach', 'Pune', provided_location=provided)
+    assert result['country_code'] == 'IN'
+    assert result['evidence'] == [{'source': 'https://example.com'}]
+
+
+def test_location_cache_scope_covers_provided_inputs_and_skips_fallbacks(monkeypatch):
+    from agents import location_analysis
+    from agents.location_analysis import LocationAnalysisAgent
+
+    class RecordingCache:
+        def __init__(self):
+            self.scopes, self.stored = [], []
+
+        def get(self, text, scope=None):
+            self.scopes.append(scope)
+
+        def set(self, text, value, scope=None):
+            self.stored.append(scope)
+
+    cache = RecordingCache()
+    monkeypatch.setattr(location_analysis, '_analysis_cache', cache)
+    agent = LocationAnalysisAgent()
+    base = {'latitude': 18.52, 'longitude': 73.85, 'country_code': 'in', 'prefetched_intelligence': {}}
+    for lat in (18.52, 19.07):
+        # No LLM is configured, so each run falls back to the deterministic summary
+        result = agent.run('AI fitness coach', 'Pune', provided_location=dict(base, latitude=lat))
+        assert 'error' not in result
+    assert cache.scopes[0] != cache.scopes[1]
+    assert cache.stored == []
+
+def test_market_evidence_prompt_respects_char_budget():
+    from agents.market_research import _format_evidence_for_prompt
+
+    evidence = [("q", {"title": f"T{i}", "snippet": "x" * 1000}) for i in range(10)]
+    text = _format_evidence_for_prompt(evidence, char_budget=1000)
+    lines = text.split("\n")
+    assert len(text) <= 1000
+    assert lines[0].startswith("[T0] ") and lines[0].endswith("...")
+    assert len(lines) == 2
+
+
+def test_market_run_batch_shares_one_search_fanout(monkeypatch):
+    import agents.market_research as market_research
+
+    calls = []
+
+    async def fake_gather(queries, max_results=5, country="us", concurrency=5):
+        calls.append(list(queries))
+        return [[{"title": f"{q} vs rivals", "url": f"https://example.com/{i}", "snippet": "online fitness"}]
+                for i, q in enumerate(queries)]
+
+    monkeypatch.setattr(market_research, "gather_web_searches", fake_gather)
+    ideas = [("An AI fitness coaching app for busy professionals", None),
+             ("A subscription meal planning service for athletes", None)]
+    reports = asyncio.run(MarketResearchAgent().run_batch(ideas))
+
+    assert len(calls) == 1 and len(calls[0]) == 10
+    assert len(reports) == 2
+    for report in reports:
+        MarketResearchResult.model_validate(report)
+        assert len(report["sources"]) == 5
+
+
+def test_market_run_batch_caps_evidence_like_run(monkeypatch):
+    import agents.market_research as market_research
+
+    async def fake_gather(queries, max_results=5, country="us", concurrency=5):
+        return [[{"title": q, "url": f"https://example.com/{i}/{j}"} for j in range(max_results)]
+                for i, q in enumerate(queries)]
+
+    evidence_by_idea = {}
+
+    def capture(self, idea, evidence):
+        evidence_by_idea[idea] = evidence
+        return {}
+
+    monkeypatch.setattr(market_research, "gather_web_searches", fake_gather)
+    monkeypatch.setattr(MarketResearchAgent, "_report_from_evidence", capture)
+    agent = MarketResearchAgent()
+    ideas = [("An AI fitness coaching app", None), ("A meal planning service", None)]
+    asyncio.run(agent.run_batch(ideas))
+
+    for idea, location in ideas:
+        evidence = evidence_by_idea[idea]
+        assert len(evidence) == market_research.EVIDENCE_TARGET
+        assert [q for q, _ in evidence] == [r["title"] for _, r in evidence]
+        assert {q for q, _ in evidence} <= set(agent._plan_queries(idea, location))
+
+def test_market_deterministic_synthesis_single_pass_scan():
+    evidence = [
+        ("q", {"title": "FitPro vs rivals", "url": "https://a.example", "snippet": "Personalized online coaching"}),
+        ("q", {"title": "Top alternatives", "url": "https://b.example", "snippet": "machine learning fitness apps"}),
+        ("q", {"title": "Wellness report", "url": "https://c.example", "snippet": "a competitor with subscription plans"}),
+    ]
+    report = MarketResearchAgent()._deterministic_synthesis("fitness app", evidence)
+
+    # Same keywords, in canonical order, that per-keyword substring checks over title and snippet find
+    assert report["market_trends"] == ["online", "subscription", "personalized", "machine learning", "fitness", "wellness"]
+    # 'vs ' counts in the title only; 'alternative'/'competitor' count in the snippet only
+    assert [c["name"] for c in report["competitors"]] == ["FitPro vs rivals", "Wellness report"]
+
+
+def test_market_evidence_stops_at_target_in_query_order(monkeypatch):
+    import agents.market_research as market_research
+
+    closed = []
+
+    def fake_iter(queries, max_results=5, country="us", max_workers=5):
+        try:
+            # Completion order differs from query order
+            for idx in (2, 0, 1, 4, 3):
+                yield idx, [{"url": f"https://example.com/{idx}/{i}"} for i in range(max_results)]
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(market_research, "iter_search_results", fake_iter)
+    queries = [f"q{i}" for i in range(5)]
+    evidence = MarketResearchAgent()._gather_market_evidence(queries)
+
+    assert len(evidence) == market_research.EVIDENCE_TARGET
+    assert [q for q, _ in evidence] == ["q0"] * 4 + ["q1"] * 4 + ["q2"] * 4
+    assert closed == [True]
+
+
+def test_location_self_correction_repairs_simple_slips_locally():
+    from agents.location_analysis import LocationAnalysisAgent
+
+    malformed = {
+        "normalized_name": "Pune, India", "coordinates": {"latitude": 18.5, "longitude": 73.8},
+        "country_code": "IN", "viability_score": 140, "market_readiness": 7,
+        "key_opportunities": "Growing gym culture", "critical_risks": None,
+        "recommendations": ["Pilot with two studios"], "evidence": ["https://example.com"],
+    }
+    # No LLM is configured here, so success can only come from the local repair
+    repaired = LocationAnalysisAgent._self_correct_analysis(malformed, "validation error")
+
+    assert "error" not in repaired
+    assert repaired["viability_score"] == 100.0
+    assert repaired["key_opportunities"] == ["Growing gym culture"] and repaired["critical_risks"] == []
+    assert repaired["evidence"] == [{"source": "https://example.com"}]
+
+
+def test_persona_compact_research_dedupes_age_ranges():
+    from agents.user_persona import UserPersonaAgent
+    agent = UserPersonaAgent()
+    results = [
+        {'url': 'https://a.example', 'snippet': 'Most users are in the age group 18-34 in Pune.'},
+        {'url': 'https://b.example', 'snippet': 'Syndicated: the age group 18-34 dominates.'},
+        {'url': 'https://c.example', 'snippet': 'Buyers aged 25 to 40 spend more.'},
+    ]
+    demographic_data = {'age_data': [], 'citations': []}
+    for result in results:
+        _, citation, found = agent._extract_result(result, is_demographic=True)
+        demographic_data['age_data'].extend(found['age_data'])
+        demographic_data['citations'].append(citation)
+    compact = UserPersonaAgent._compact_research(demographic_data, {})
+    assert compact['age_ranges'] == [[18, 34], [25, 40]]
+
+
+def test_location_trend_direction_without_numpy(monkeypatch):
+    from agents import location_analysis
+    from agents.location_analysis import LocationAnalysisAgent
+
+    series = [40, 42, 50, 55]
+    with_numpy = LocationAnalysisAgent._calculate_trend_direction(series)
+    monkeypatch.setattr(location_analysis, 'np', None)
+    assert LocationAnalysisAgent._calculate_trend_direction(series) == with_numpy
+    assert with_numpy == {'average_interest': 46.75, 'trend_direction': 'Rising'}
+    assert LocationAnalysisAgent._calculate_trend_direction([]) is None
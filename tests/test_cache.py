@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+from core.cache import PersistentCache, SingleFlight, cached
+
+
+def test_persistent_cache_roundtrip_survives_new_instance(tmp_path):
+    path = os.path.join(str(tmp_path), "cache.sqlite3")
+    cache = PersistentCache("geocode", ttl=60, path=path)
+    cache.set("pune", {"city": "Pune", "coordinates": {"latitude": 18.5, "longitude": 73.8}})
+
+    fresh = PersistentCache("geocode", ttl=60, path=path)
+    assert fresh.get("pune")["city"] == "Pune"
+    assert fresh.get("mumbai") is None
+
+
+def test_persistent_cache_returns_copies_and_expires(tmp_path):
+    path = os.path.join(str(tmp_path), "cache.sqlite3")
+    cache = PersistentCache("search", path=path)
+    cache.set("q", [{"url": "https://example.com"}])
+    first = cache.get("q")
+    first[0]["url"] = "mutated"
+    assert cache.get("q")[0]["url"] == "https://example.com"
+
+    cache.set("old", "value", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("old") is None
+
+
+def test_semantic_cache_matches_rephrased_text_within_scope(tmp_path):
+    from core.semantic_cache import SemanticCache
+
+    path = os.path.join(str(tmp_path), "cache.sqlite3")
+    cache = SemanticCache("location_analysis", threshold=0.9, path=path)
+    cache.set("AI fitness app for personalized workouts", {"viability_score": 60.0}, scope="pune")
+
+    assert cache.get("ai fitness app for personalized workouts!", scope="pune") == {"viability_score": 60.0}
+    assert cache.get("ai fitness app for personalized workouts", scope="mumbai") is None
+    assert cache.get("decentralized freelancer payments platform", scope="pune") is None
+
+
+def test_semantic_cache_fallback_embedding_tells_swapped_roles_apart(tmp_path, monkeypatch):
+    from core import semantic_cache
+
+    monkeypatch.setattr(semantic_cache, "SentenceTransformer", None)
+    path = os.path.join(str(tmp_path), "cache.sqlite3")
+    cache = semantic_cache.SemanticCache("location_analysis", threshold=0.93, path=path)
+    cache.set("marketplace connecting dog owners with cat sitters", {"viability_score": 60.0}, scope="pune")
+
+    assert cache.get("Marketplace connecting dog owners with cat sitters.", scope="pune") == {"viability_score": 60.0}
+    assert cache.get("marketplace connecting cat owners with dog sitters", scope="pune") is None
+
+
+def test_cached_decorator_skips_falsy_results(tmp_path):
+    calls = []
+
+    @cached("test_cached", ttl=60)
+    def lookup(query, limit=3):
+        calls.append(query)
+        return [query] * limit if query != "empty" else []
+
+    lookup.cache.path = str(tmp_path / "cache.sqlite3")
+    assert lookup("a", limit=2) == ["a", "a"]
+    assert lookup("a", limit=2) == ["a", "a"]
+    assert lookup("empty") == []
+    assert lookup("empty") == []
+    assert calls == ["a", "empty", "empty"]
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(1)
+    follower.join(1)
+
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+    # Once finished, the key is free again
+    assert flight.do("k", lambda: "fresh") == "fresh"
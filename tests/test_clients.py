@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+
+from core import clients
+
+
+def test_search_many_preserves_order_and_isolates_failures(monkeypatch):
+    def fake_search(query, max_results=5, country="us"):
+        if query == "boom":
+            raise RuntimeError("backend down")
+        time.sleep(0.01 if query == "slow" else 0)
+        return [{"title": query}]
+
+    monkeypatch.setattr(clients, "enhanced_web_search", fake_search)
+    results = clients.search_many(["slow", "boom", "fast"], max_results=2)
+    assert results == [[{"title": "slow"}], [], [{"title": "fast"}]]
+
+
+def test_iter_search_results_yields_in_completion_order(monkeypatch):
+    def fake_search(query, max_results=5, country="us"):
+        time.sleep(0.05 if query == "slow" else 0)
+        return [{"title": query}]
+
+    monkeypatch.setattr(clients, "enhanced_web_search", fake_search)
+    results = list(clients.iter_search_results(["slow", "fast"]))
+    assert results == [(1, [{"title": "fast"}]), (0, [{"title": "slow"}])]
+
+
+def test_gather_web_searches_runs_reworded_queries_once(monkeypatch):
+    calls = []
+
+    def fake_search(query, max_results=5, country="us"):
+        calls.append(query)
+        return [{"url": f"https://example.com/{len(calls)}"}]
+
+    monkeypatch.setattr(clients, "enhanced_web_search", fake_search)
+    queries = ["AI fitness market size, 2024", "ai fitness  \"market size\" 2024",
+               "US exports to China", "China exports to US"]
+    results = asyncio.run(clients.gather_web_searches(queries))
+
+    assert sorted(calls) == ["AI fitness market size, 2024", "China exports to US", "US exports to China"]
+    assert results[0] == results[1] and results[0] is not results[1]
+
+
+def test_canonical_query_keeps_non_ascii_words():
+    assert clients.canonical_query("पुणे में फिटनेस ऐप") != clients.canonical_query("मुंबई में फिटनेस ऐप")
+    assert clients.canonical_query("Café  São Paulo") == "café são paulo"
+    assert clients.canonical_query("C++ jobs") != clients.canonical_query("C jobs")
+
+
+def test_serpapi_search_retries_only_transient_errors(monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params["q"])
+        resp = requests.Response()
+        resp.status_code = 503 if len(calls) == 1 else 404
+        return resp
+
+    monkeypatch.setattr(clients._http, "get", fake_get)
+    monkeypatch.setattr(clients._serpapi_search.retry, "wait", lambda state: 0)
+    with pytest.raises(requests.HTTPError) as excinfo:
+        clients._serpapi_search("q", 3, "us", "key")
+    # The 503 is retried; the 404 that follows is raised immediately.
+    assert excinfo.value.response.status_code == 404
+    assert len(calls) == 2
+
+
+def test_dedupe_results_keys_on_url_then_title_and_snippet():
+    results = [
+        {"url": "https://a.example", "title": "A"},
+        {"url": "https://a.example", "title": "A again"},
+        {"title": "No url", "snippet": "s"},
+        {"title": "No url", "snippet": "s"},
+        {"title": "No url", "snippet": "different"},
+    ]
+    assert [r["title"] for r in clients.dedupe_results(results)] == ["A", "No url", "No url"]
+
+
+def test_result_key_treats_trivial_url_variants_as_one_page():
+    variants = ["https://www.Example.com/report/", "http://example.com/report", "https://example.com/report#tam",
+                "https://example.com/report?utm_source=news&utm_medium=email"]
+    assert len({clients.result_key({"url": u}) for u in variants}) == 1
+    assert clients.result_key({"url": "https://example.com/report?id=2"}) != clients.result_key({"url": "https://example.com/report"})
+    # Without a URL, copies that differ only past the first 128 snippet characters are one result
+    assert clients.result_key({"title": "T", "content": "x" * 128 + "a"}) == clients.result_key({"title": "T", "snippet": "x" * 500})
+
+
+def test_dedupe_results_keeps_best_scored_copy_and_stops_at_limit():
+    results = [
+        {"url": "a", "score": 1},
+        {"url": "b", "score": 5},
+        {"url": "a", "score": 9},
+        {"url": "c", "score": 3},
+    ]
+    unique = clients.dedupe_results(results, limit=2, score=lambda r: r["score"])
+    assert unique == [{"url": "a", "score": 9}, {"url": "b", "score": 5}]
+
+
+def test_pack_json_keeps_whole_items_within_the_token_budget():
+    from core.text import count_tokens, pack_json
+
+    items = [{"title": f"Result {i}", "snippet": "word " * 40} for i in range(20)]
+    packed = pack_json(items, token_budget=200)
+    decoded = json.loads(packed)
+    assert 0 < len(decoded) < len(items)
+    assert decoded == items[:len(decoded)]
+    assert count_tokens(packed) <= 200
+
+
+def test_extract_object_finds_first_balanced_object():
+    from core.json_utils import extract_object
+
+    assert extract_object('{"a": 1}') == {"a": 1}
+    wrapped = 'Here you go:\n```json\n{"risk": "x}{", "nested": {"level": 2}}\n```\nThanks {'
+    assert extract_object(wrapped) == {"risk": "x}{", "nested": {"level": 2}}
+    with pytest.raises(ValueError):
+        extract_object('{"a": 1')
+
+
+def test_object_scanner_tracks_escapes_across_chunks():
+    from core.json_utils import ObjectScanner
+
+    text = '{"quote": "a \\"}\\\\", "b": {}} trailing'
+    for split in range(len(text) + 1):
+        scanner = ObjectScanner()
+        end = scanner.feed(text[:split])
+        if end < 0:
+            end = split + scanner.feed(text[split:])
+        assert text[:end] == text[:text.index(" trailing")]
+
+
+def test_llm_calls_retry_rate_limits_but_not_bad_requests(monkeypatch):
+    from types import SimpleNamespace as NS
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    class BadRequestError(Exception):
+        status_code = 400
+
+    outcomes = [RateLimitError(), NS(choices=[NS(message=NS(content="ok"))])]
+
+    def create(**kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(clients, "groq_client", NS(chat=NS(completions=NS(create=create))))
+    monkeypatch.setattr(clients._groq_generate.retry, "wait", lambda state: 0)
+    assert clients._groq_generate("prompt", False) == "ok"
+
+    outcomes[:] = [BadRequestError()]
+    with pytest.raises(BadRequestError):
+        clients._groq_generate("prompt", False)
+    assert outcomes == []
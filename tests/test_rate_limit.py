@@ -0,0 +1,28 @@
+import asyncio
+
+from core.rate_limit import TokenBucket
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate=50, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    waited = bucket.acquire()
+    assert 0 < waited <= 0.05
+
+
+def test_token_bucket_async_acquire_shares_the_same_budget():
+    bucket = TokenBucket(rate=50, capacity=1)
+    assert bucket.acquire() == 0
+    waited = asyncio.run(bucket.acquire_async())
+    assert 0 < waited <= 0.05
+
+
+def test_token_bucket_adapts_rate_from_headers():
+    bucket = TokenBucket(rate=5, capacity=5)
+    assert bucket.update_from_headers({"x-ratelimit-remaining": "10", "x-ratelimit-reset": "20"}) == 0.5
+    assert bucket.rate == 0.5
+    # Plenty of quota never raises the rate above the burst size.
+    assert bucket.update_from_headers({"x-ratelimit-remaining": "1000", "x-ratelimit-reset": "1"}) == 5
+    assert bucket.update_from_headers({}) is None
+    assert bucket.rate == 5
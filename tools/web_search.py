@@ -3,9 +3,13 @@ from typing import List, Dict
 import os
 import logging
 from core import clients
+from core.cache import PersistentCache
 
 logger = logging.getLogger(__name__)
 
+# Non-empty results per (query, max_results), shared with other processes through the disk cache.
+_tavily_cache = PersistentCache("tavily_search", ttl=6 * 3600, maxsize=512)
+
 
 @retry(
     stop=stop_after_attempt(3),
@@ -26,6 +30,19 @@ def tavily_search(query: str, max_results: int = 5) -> List[Dict]:
         logger.debug("DEBUG_FAST_MODE enabled: returning no results for '%s'", query)
         return []
 
+    cache_key = f"{query}|{max_results}"
+    cached = _tavily_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    results = _search_backends(query, max_results)
+    if results:
+        _tavily_cache.set(cache_key, results)
+    return results
+
+
+def _search_backends(query: str, max_results: int) -> List[Dict]:
+    """Tries each configured backend in priority order; an empty list when none answers."""
     # 1) Tavily client if configured
     tavily_client = getattr(clients, "tavily_client", None)
     if tavily_client: